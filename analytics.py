@@ -0,0 +1,133 @@
+"""Streaming band-score rollups for the academic team.
+
+Every computed result adds one count to a 17-bucket half-band histogram keyed
+by (day, module, skill), and to an all-time histogram keyed by (module, skill).
+Reports only read these histograms, so they cost O(buckets) whatever the
+number of results. Rollups are snapshotted to a JSON file periodically and
+on shutdown, and reloaded at startup.
+"""
+import json
+import logging
+import math
+import os
+import threading
+from datetime import datetime, timezone
+
+HALF_BANDS = 17  # 1.0, 1.5, ..., 9.0
+BANDS = tuple(1.0 + index / 2 for index in range(HALF_BANDS))
+
+# Results computed without choosing a module (Listening, Writing, Speaking)
+NO_MODULE = "Unspecified"
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analytics.json")
+
+logger = logging.getLogger(__name__)
+
+
+def bucket(band):
+    """Half-band bucket 0 - 16 for a band, or None if it is not a half band from 1.0 to 9.0."""
+    if not math.isfinite(band):
+        return None
+    index = (band - 1.0) * 2
+    if index != int(index) or not 0 <= index < HALF_BANDS:
+        return None
+    return int(index)
+
+
+def today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def describe(histogram):
+    """Return ``(count, mean, median)`` of a histogram, or None if it is empty."""
+    count = sum(histogram)
+    if not count:
+        return None
+    mean = sum(n * band for n, band in zip(histogram, BANDS)) / count
+    seen = 0
+    for n, band in zip(histogram, BANDS):
+        seen += n
+        if seen * 2 >= count:
+            return count, mean, band
+
+
+class Rollups:
+    """Per-day and all-time half-band histograms per module and skill."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("ANALYTICS_PATH") or DEFAULT_PATH
+        self._lock = threading.Lock()
+        self._daily = {}  # day -> {(module, skill): histogram}
+        self._totals = {}  # (module, skill) -> histogram
+        self._dirty = False
+
+    def add(self, skill, band, module=None, day=None):
+        """Count a result; bands off the half-band grid are logged and ignored."""
+        index = bucket(band)
+        if index is None:
+            logger.warning("Ignored %s band %r outside the half-band grid", skill, band)
+            return
+        key = (module or NO_MODULE, skill)
+        with self._lock:
+            daily = self._daily.setdefault(day or today(), {}).setdefault(key, [0] * HALF_BANDS)
+            totals = self._totals.setdefault(key, [0] * HALF_BANDS)
+            daily[index] += 1
+            totals[index] += 1
+            self._dirty = True
+
+    def histograms(self, day=None):
+        """Return ``{(module, skill): histogram}`` for one day, or all time."""
+        with self._lock:
+            histograms = self._totals if day is None else self._daily.get(day, {})
+            return {key: list(histogram) for key, histogram in histograms.items()}
+
+    # Persistence
+
+    def load(self):
+        """Restore rollups from the last snapshot, if there is one."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._daily.clear()
+            self._totals.clear()
+            for day, module, skill, histogram in data["daily"]:
+                self._daily.setdefault(day, {})[(module, skill)] = list(histogram)
+                totals = self._totals.setdefault((module, skill), [0] * HALF_BANDS)
+                for index, n in enumerate(histogram):
+                    totals[index] += n
+
+    def snapshot(self):
+        """Write the rollups to disk atomically if anything changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            daily = [
+                [day, module, skill, list(histogram)]
+                for day, histograms in sorted(self._daily.items())
+                for (module, skill), histogram in sorted(histograms.items())
+            ]
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"daily": daily}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            self._dirty = True
+            raise
+
+    def snapshot_every(self, interval):
+        """Snapshot in a daemon thread every ``interval`` seconds."""
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.snapshot()
+                except OSError:
+                    logger.exception("Analytics snapshot failed")
+
+        stop = threading.Event()
+        threading.Thread(target=run, name="analytics-snapshot", daemon=True).start()
+        return stop
@@ -0,0 +1,289 @@
+"""Rate-limited fan-out of admin announcements to every subscriber.
+
+``Broadcaster`` sends one broadcast at a time from a background thread, with
+its own Bot and connection pool, so the dispatcher never waits on it:
+
+* chats are read from ``SubscriberStore`` in batches, in chat id order;
+* each batch is sent by a pool of worker threads that share one
+  ``RateLimiter``, kept below Telegram's limit of about 30 messages per
+  second per bot (``BROADCAST_RATE``, default 25/s);
+* a 429 (``RetryAfter``) pauses every worker for the time Telegram asks and
+  the message is sent again. Timeouts and network errors are retried with
+  backoff, up to ``MAX_ATTEMPTS`` times;
+* chats that blocked the bot or no longer exist are marked blocked and
+  skipped by later broadcasts until they write to the bot again;
+* after every batch the cursor and counters are checkpointed. A broadcast
+  stopped by a restart resumes on the next start. Messages sent after the
+  last checkpoint may be sent again (at-least-once delivery).
+
+Benchmark against a local fake Bot API, which enforces its own flood limit:
+
+    python broadcast.py [--chats 100000] [--rate 25] [--workers 8] [--latency 50]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError, Unauthorized
+
+import subscribers
+
+logger = logging.getLogger(__name__)
+
+SENT, BLOCKED, FAILED, SKIPPED = "sent", "blocked", "failed", "skipped"
+
+# Attempts per message for timeouts and network errors; 429s always retry
+MAX_ATTEMPTS = 3
+BACKOFF = 1.0
+
+# Chats that can never receive the message
+UNREACHABLE_ERRORS = ("chat not found", "user is deactivated", "bot was kicked", "peer_id_invalid")
+
+
+class RateLimiter:
+    """Spaces calls ``1 / rate`` seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self, stop):
+        """Wait for the next slot; return False if ``stop`` is set first."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        return not stop.wait(slot - now) if slot > now else not stop.is_set()
+
+    def pause(self, seconds):
+        """Hand out no slots for ``seconds``, after a 429."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+def summary(broadcast, subscriber_count=None):
+    """One-paragraph status of a broadcast, for the admin."""
+    state = "finished" if broadcast.finished_at else "in progress"
+    text = (
+        f"Broadcast #{broadcast.id} {state}: {broadcast.sent} sent, {broadcast.blocked} blocked, "
+        f"{broadcast.failed} failed, {broadcast.retries} retries"
+    )
+    if broadcast.finished_at:
+        text += f", {broadcast.finished_at - broadcast.created_at:.0f}s"
+    elif subscriber_count is not None:
+        text += f", about {subscriber_count} reachable chats"
+    return text + "."
+
+
+class Broadcaster:
+    """Sends broadcasts from ``SubscriberStore`` in a background thread."""
+
+    def __init__(self, bot, store, rate=None, workers=None, batch_size=500):
+        self.bot = bot
+        self.store = store
+        self.limiter = RateLimiter(rate or float(os.getenv("BROADCAST_RATE", "25")))
+        self.workers = workers or int(os.getenv("BROADCAST_WORKERS", "8"))
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def active(self):
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def start(self, text, parse_mode=None, admin_chat_id=None):
+        """Create and start a broadcast; return it, or None if one is running."""
+        with self._lock:
+            if self.active or self._stop.is_set():
+                return None
+            broadcast = self.store.create_broadcast(text, parse_mode, admin_chat_id)
+            self._launch(broadcast)
+        return broadcast
+
+    def resume(self):
+        """Continue the last unfinished broadcast, if any; return it."""
+        with self._lock:
+            broadcast = self.store.latest_broadcast(unfinished=True)
+            if broadcast is None or self.active:
+                return None
+            self._launch(broadcast)
+        logger.info("Resuming broadcast #%d after chat %d", broadcast.id, broadcast.cursor)
+        return broadcast
+
+    def _launch(self, broadcast):
+        self._thread = threading.Thread(target=self._run, args=(broadcast,), name="broadcast", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop sending and checkpoint; the broadcast resumes on the next start."""
+        self._stop.set()
+        self.wait(timeout)
+
+    def wait(self, timeout=None):
+        """Block until the running broadcast finishes or stops."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, broadcast):
+        cursor = broadcast.cursor
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="broadcast-send") as executor:
+            while not self._stop.is_set():
+                chats = self.store.chats_after(cursor, self.batch_size)
+                if not chats:
+                    self.store.checkpoint(broadcast.id, cursor, 0, 0, 0, 0, finished=True)
+                    break
+                futures = [executor.submit(self._send, broadcast, chat_id) for chat_id in chats]
+                cursor = self._checkpoint(broadcast, cursor, chats, [future.result() for future in futures])
+
+        broadcast = self.store.broadcast(broadcast.id)
+        logger.info(summary(broadcast))
+        if broadcast.finished_at and broadcast.admin_chat_id:
+            try:
+                self.bot.send_message(broadcast.admin_chat_id, summary(broadcast))
+            except TelegramError:
+                logger.exception("Could not report broadcast #%d", broadcast.id)
+
+    def _checkpoint(self, broadcast, cursor, chats, results):
+        """Save a batch's progress; return the new cursor.
+
+        The cursor only moves past chats whose send completed, up to the
+        first one skipped by a stop. Anything sent after that is sent again
+        on resume and counted then; blocked chats are recorded regardless.
+        """
+        counts = Counter()
+        blocked = []
+        for chat_id, (outcome, retries) in zip(chats, results):
+            if outcome == BLOCKED:
+                blocked.append(chat_id)
+            if SKIPPED in counts:
+                continue
+            counts[outcome] += 1
+            counts["retries"] += retries
+            if outcome != SKIPPED:
+                cursor = chat_id
+        self.store.checkpoint(
+            broadcast.id, cursor, counts[SENT], len(blocked), counts[FAILED], counts["retries"], blocked
+        )
+        return cursor
+
+    def _send(self, broadcast, chat_id):
+        """Deliver to one chat; return ``(outcome, retries)``."""
+        retries = attempts = 0
+        while self.limiter.acquire(self._stop):
+            try:
+                self.bot.send_message(
+                    chat_id, broadcast.text, parse_mode=broadcast.parse_mode, disable_web_page_preview=True
+                )
+                return SENT, retries
+            except RetryAfter as e:
+                self.limiter.pause(e.retry_after)
+            except Unauthorized:
+                return BLOCKED, retries
+            except BadRequest as e:
+                if any(error in e.message.lower() for error in UNREACHABLE_ERRORS):
+                    return BLOCKED, retries
+                logger.warning("Broadcast #%d to %d failed: %s", broadcast.id, chat_id, e.message)
+                return FAILED, retries
+            except NetworkError as e:
+                attempts += 1
+                if attempts >= MAX_ATTEMPTS:
+                    logger.warning("Broadcast #%d to %d failed: %s", broadcast.id, chat_id, e.message)
+                    return FAILED, retries
+                self._stop.wait(BACKOFF * 2 ** (attempts - 1))
+            except TelegramError as e:
+                logger.warning("Broadcast #%d to %d failed: %s", broadcast.id, chat_id, e.message)
+                return FAILED, retries
+            retries += 1
+        return SKIPPED, retries
+
+
+# Benchmark
+
+# Fake Bot API token; nothing is sent to Telegram
+TOKEN = "123456:broadcast"
+
+
+def fake_bot(latency, api_limit, blocked_every):
+    """A Bot answered locally: ``latency`` seconds per call, 429s above
+    ``api_limit`` calls per second, and every ``blocked_every``-th chat blocked.
+    """
+    from telegram import Bot
+    from telegram.utils.request import Request
+
+    class FakeRequest(Request):
+        calls = Counter()
+        _lock = threading.Lock()
+        _window = [0.0, 0]
+
+        def post(self, url, data, timeout=None):
+            time.sleep(latency)
+            chat_id = data.get("chat_id", 0)
+            with self._lock:
+                now = time.monotonic()
+                if now - self._window[0] >= 1:
+                    self._window[:] = [now, 0]
+                self._window[1] += 1
+                flooded = self._window[1] > api_limit
+                self.calls["429" if flooded else "ok"] += 1
+            if flooded:
+                raise RetryAfter(1)
+            if blocked_every and chat_id % blocked_every == 0:
+                raise Unauthorized("Forbidden: bot was blocked by the user")
+            return {
+                "message_id": 1, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "text": data.get("text", ""),
+            }
+
+    request = FakeRequest(con_pool_size=2)
+    return Bot(TOKEN, request=request), request.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=100000, help="subscribers to broadcast to")
+    parser.add_argument("--rate", type=float, default=25, help="messages per second")
+    parser.add_argument("--workers", type=int, default=8, help="sending threads")
+    parser.add_argument("--latency", type=float, default=50, help="ms per fake Bot API call")
+    parser.add_argument("--api-limit", type=int, default=30, help="fake API calls per second before 429s")
+    parser.add_argument("--blocked-every", type=int, default=20, help="every Nth chat has blocked the bot")
+    parser.add_argument("--stop-after", type=float, help="stop after this many seconds, then resume")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)s - %(message)s", level=logging.WARNING)
+    bot, calls = fake_bot(args.latency / 1000, args.api_limit, args.blocked_every)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = subscribers.SubscriberStore(os.path.join(directory, "subscribers.sqlite3"))
+        store.add_many(range(1, args.chats + 1))
+
+        started = time.perf_counter()
+        broadcaster = Broadcaster(bot, store, rate=args.rate, workers=args.workers)
+        broadcast = broadcaster.start("Mock test on Saturday")
+        if args.stop_after:
+            time.sleep(args.stop_after)
+            broadcaster.stop()
+            print(summary(store.broadcast(broadcast.id)), "Resuming.")
+            broadcaster = Broadcaster(bot, store, rate=args.rate, workers=args.workers)
+            broadcaster.resume()
+        broadcaster.wait()
+        elapsed = time.perf_counter() - started
+
+        broadcast = store.broadcast(broadcast.id)
+        print(summary(broadcast))
+        print(f"{broadcast.sent + broadcast.blocked + broadcast.failed} chats in {elapsed:.1f}s "
+              f"({(broadcast.sent + broadcast.blocked) / elapsed:.1f}/s), "
+              f"{calls['ok']} API calls, {calls['429']} 429s, {store.count()[1]} chats marked blocked")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Graceful shutdown and polling handoff for the bot worker.
+
+A restart used to stop the updater wherever it was: a long queue could be
+cut off or run past the platform's kill deadline, and state was only saved
+if that happened to finish. ``Drainer.drain`` shuts down in order, within
+``deadline`` seconds:
+
+1. stop fetching updates. Everything already fetched has been confirmed to
+   Telegram by the next getUpdates call, so it is ours to finish; anything
+   newer stays with Telegram for the next worker;
+2. let the dispatcher finish the queued updates and the running handler.
+   Replies are sent from inside the handlers, so this also flushes them;
+3. run the ``on_drained`` callbacks that persist state, then exit.
+
+Handoff: Telegram serves getUpdates to one client per token, and a new
+request ends any pending one with a ``Conflict`` error. A worker that has
+already polled successfully treats that error as a new worker taking over:
+``PollingBot`` stops the polling loop right there, before the updater's
+retry could end the new worker's request in turn, and the worker drains.
+A worker that has not polled yet keeps retrying, so the newest worker
+always ends up polling. Any other client polling with the token (say, a
+local run) also ends polling for good, so that case is logged as an error.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+from queue import Empty
+
+from telegram.error import Conflict
+from telegram.ext import ExtBot
+
+logger = logging.getLogger(__name__)
+
+
+class PollingBot(ExtBot):
+    """ExtBot that records when getUpdates last succeeded and reports handoffs."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_poll = None  # time.monotonic() of the last successful getUpdates
+        self.on_handoff = None  # called in the polling thread on a Conflict after a successful poll
+
+    def get_updates(self, *args, **kwargs):
+        try:
+            updates = super().get_updates(*args, **kwargs)
+        except Conflict:
+            if self.last_poll is not None and self.on_handoff is not None:
+                self.on_handoff()
+            raise
+        self.last_poll = time.monotonic()
+        return updates
+
+
+class Drainer:
+    """Drains an ``Updater`` on a stop signal or a polling handoff."""
+
+    def __init__(self, updater, deadline=20.0):
+        self.updater = updater
+        self.deadline = deadline
+        self.drained = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._started = False
+        if isinstance(updater.bot, PollingBot):
+            updater.bot.on_handoff = self.hand_off
+
+    def on_drained(self, callback):
+        """Call ``callback()`` once no more updates will be handled."""
+        self._callbacks.append(callback)
+
+    def request(self, reason):
+        """Start draining in the background; later requests are ignored."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self.drain, args=(reason,), name="drain").start()
+
+    def drain(self, reason):
+        logger.info("Draining: %s", reason)
+        end = time.monotonic() + self.deadline
+        update_queue = self.updater.dispatcher.update_queue
+
+        # The polling loop exits after its current request; updates it still
+        # receives are not confirmed and go to the next worker
+        self.updater.running = False
+
+        with update_queue.all_tasks_done:
+            while update_queue.unfinished_tasks and time.monotonic() < end:
+                update_queue.all_tasks_done.wait(end - time.monotonic())
+
+        dropped = 0
+        while True:
+            try:
+                update_queue.get_nowait()
+            except Empty:
+                break
+            update_queue.task_done()
+            dropped += 1
+        if dropped:
+            logger.warning("Drain deadline reached, dropped %d queued updates", dropped)
+
+        self.updater.dispatcher.stop()
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Shutdown callback %r failed", callback)
+        logger.info("Drained in %.1fs", self.deadline - (end - time.monotonic()))
+        self.drained.set()
+
+    def hand_off(self):
+        """Stop polling at once and drain, because another client is polling.
+
+        Runs in the polling thread, so the updater's retry loop sees
+        ``running`` cleared and never polls again.
+        """
+        self.updater.running = False
+        logger.error(
+            "Another client is polling with this token. Stopping polling and draining; "
+            "if no new worker was started, the token is in use elsewhere and this worker will not poll again"
+        )
+        self.request("another worker started polling")
+
+    def handle_error(self, update, context):
+        """Dispatcher error handler: log errors, except polling conflicts.
+
+        Conflicts are handled by ``PollingBot`` in the polling thread; the
+        updater also queues them here, behind the pending updates.
+        """
+        if isinstance(context.error, Conflict):
+            return
+        logger.error("Update %s caused an error", update, exc_info=context.error)
+
+    def idle(self, stop_signals=(signal.SIGINT, signal.SIGTERM, signal.SIGABRT)):
+        """Block until drained, draining on the first stop signal.
+
+        A second signal exits at once, like ``Updater.idle``.
+        """
+        def handle_signal(signum, frame):
+            if self._started:
+                logger.warning("Exiting immediately!")
+                os._exit(1)
+            self.request(signal.Signals(signum).name)
+
+        for sig in stop_signals:
+            signal.signal(sig, handle_signal)
+
+        while not self.drained.wait(1):
+            pass
+
+        # Only the polling thread is left; it returns after its current request
+        self.updater.stop()
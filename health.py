@@ -0,0 +1,335 @@
+"""Health and resource diagnostics for the bot worker.
+
+``HealthMonitor`` samples the process in a background thread every
+``interval`` seconds and keeps the latest snapshot, so reading it costs
+nothing:
+
+* memory: resident set size, peak RSS and the memory limit, if known;
+* gc: collections, collected objects and pause times per generation;
+* threads: live threads against the thread limit, and how busy the
+  dispatcher thread was since the last sample (share of wall time spent
+  handling updates);
+* state: conversations in progress and ``user_data`` / ``chat_data`` entries;
+* queue: updates waiting in the dispatcher's queue, per priority class;
+* outbound: latency of recent Bot API calls (``TimedRequest``), long polls
+  excluded;
+* polling: seconds since getUpdates last succeeded (``PollingBot``).
+
+A snapshot is "degraded" when polling has stalled or memory or threads are
+near their limit; each problem is listed and logged when it first appears.
+``serve`` exposes the snapshot as JSON over HTTP, with status 503 while
+degraded, for autoscaling and alerting:
+
+    curl -s localhost:$HEALTH_PORT/health
+"""
+import gc
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram.ext import ConversationHandler
+from telegram.utils.request import Request
+
+logger = logging.getLogger(__name__)
+
+# Share of a limit at which the worker counts as degraded
+NEAR_LIMIT = 0.9
+
+MB = 1024 * 1024
+
+
+class TimedRequest(Request):
+    """Request that keeps the latency of recent Bot API calls, except getUpdates."""
+
+    __slots__ = ("latencies", "errors")
+
+    def __init__(self, *args, window=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = deque(maxlen=window)
+        self.errors = 0
+
+    def post(self, url, data, timeout=None):
+        # Long polls last as long as the poll timeout, not the network
+        if url.endswith("/getUpdates"):
+            return super().post(url, data, timeout)
+        started = time.monotonic()
+        try:
+            return super().post(url, data, timeout)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.latencies.append(time.monotonic() - started)
+
+
+# Process readings; every limit is None when unknown
+
+def rss_bytes():
+    """Current resident set size."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def read_limit(*paths):
+    """First numeric value in the given cgroup files."""
+    for path in paths:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 2 ** 60:
+            return int(value)
+    return None
+
+
+def memory_limit_bytes():
+    """``HEALTH_MEMORY_LIMIT_MB`` (the dyno's quota), else the cgroup limit."""
+    setting = os.getenv("HEALTH_MEMORY_LIMIT_MB")
+    if setting:
+        return int(float(setting) * MB)
+    return read_limit("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+
+
+def thread_limit():
+    limit = read_limit("/sys/fs/cgroup/pids.max", "/sys/fs/cgroup/pids/pids.max")
+    if limit is None:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NPROC)
+        limit = soft if soft != resource.RLIM_INFINITY else None
+    return limit
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def summary(snapshot):
+    """Plain-text rendering of a snapshot, for the admin command."""
+    def ms(value):
+        return f"{value:.0f}ms"
+
+    memory, threads, state = snapshot["memory"], snapshot["threads"], snapshot["state"]
+    queue, outbound, poll_age = snapshot["queue"], snapshot["outbound"], snapshot["polling"]["last_poll_age_s"]
+    lines = [f"Health: {snapshot['status']}"] + [f"⚠️ {problem}" for problem in snapshot["problems"]]
+
+    line = f"\nRSS {memory['rss_mb']:.0f}MB (peak {memory['peak_rss_mb']:.0f}MB"
+    lines.append(line + (f", limit {memory['limit_mb']:.0f}MB)" if memory["limit_mb"] else ")"))
+    line = f"Threads {threads['active']}" + (f" of {threads['limit']}" if threads["limit"] else "")
+    if threads["dispatcher_utilization"] is not None:
+        line += f", dispatcher {threads['dispatcher_utilization']:.0%} busy"
+    lines.append(line)
+    lines.append(
+        f"Conversations {state['conversations']}, user_data {state['user_data']}, chat_data {state['chat_data']}"
+    )
+    lines.append(f"Queue {queue['depth']}" + (
+        " (" + ", ".join(f"{name} {depth}" for name, depth in queue.items() if name != "depth") + ")"
+        if len(queue) > 1 else ""
+    ))
+    if outbound.get("p50_ms") is not None:
+        lines.append(
+            f"Bot API p50 {ms(outbound['p50_ms'])}, p95 {ms(outbound['p95_ms'])}, max {ms(outbound['max_ms'])} "
+            f"over the last {outbound['calls']} calls, {outbound['errors']} errors"
+        )
+    lines.append(f"Last poll {poll_age:.1f}s ago" if poll_age is not None else "No successful poll yet")
+
+    generations = snapshot["gc"]["generations"]
+    lines.append("GC collections " + "/".join(str(g["collections"]) for g in generations)
+                 + ", max pause " + "/".join(ms(g["pause_max_ms"]) for g in generations))
+    lines.append(f"\nSampled {time.time() - snapshot['time']:.0f}s ago, up {snapshot['uptime_s'] / 3600:.1f}h")
+    return "\n".join(lines)
+
+
+class HealthMonitor:
+    """Background sampler of the worker's health; see the module docstring."""
+
+    def __init__(self, dispatcher, request=None, interval=10.0, max_poll_age=60.0):
+        self.dispatcher = dispatcher
+        self.request = request
+        self.interval = interval
+        self.max_poll_age = max_poll_age
+        self.snapshot = None
+        self._started = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+        self._problems = set()
+        self._last_sample = (self._started, self._busy_time())
+
+        # Pause times per generation, from gc callbacks
+        self._gc_started = None
+        self._gc_pauses = [[0.0, 0.0] for _ in range(3)]  # total, max (seconds)
+
+    # GC pause timing
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            pause = time.perf_counter() - self._gc_started
+            pauses = self._gc_pauses[info["generation"]]
+            pauses[0] += pause
+            pauses[1] = max(pauses[1], pause)
+            self._gc_started = None
+
+    # Sampling
+
+    def _busy_time(self):
+        busy_time = getattr(self.dispatcher.update_queue, "busy_time", None)
+        return busy_time() if busy_time else None
+
+    def _conversations(self):
+        return sum(
+            len(handler.conversations)
+            for group in self.dispatcher.handlers.values()
+            for handler in group
+            if isinstance(handler, ConversationHandler)
+        )
+
+    def sample(self):
+        """Take a snapshot now, store it and return it."""
+        now = time.monotonic()
+        busy = self._busy_time()
+        sampled_at, sampled_busy = self._last_sample
+        self._last_sample = (now, busy)
+        utilization = None
+        if busy is not None and sampled_busy is not None and now > sampled_at:
+            utilization = min(1.0, (busy - sampled_busy) / (now - sampled_at))
+
+        rss, memory_limit = rss_bytes(), memory_limit_bytes()
+        threads, max_threads = threading.active_count(), thread_limit()
+        last_poll = getattr(self.dispatcher.bot, "last_poll", None)
+        poll_age = now - last_poll if last_poll is not None else None
+
+        update_queue = self.dispatcher.update_queue
+        queue = {"depth": update_queue.qsize()}
+        if hasattr(update_queue, "stats"):
+            queue.update({name: stats["depth"] for name, stats in update_queue.stats().items()})
+
+        outbound = {"calls": 0}
+        if self.request is not None:
+            latencies = list(self.request.latencies)
+            outbound = {"calls": len(latencies), "errors": self.request.errors}
+            if latencies:
+                outbound.update({
+                    "mean_ms": sum(latencies) / len(latencies) * 1000,
+                    "p50_ms": percentile(latencies, 0.5) * 1000,
+                    "p95_ms": percentile(latencies, 0.95) * 1000,
+                    "max_ms": max(latencies) * 1000,
+                })
+
+        problems = {}
+        if poll_age is None and now - self._started > self.max_poll_age:
+            problems["polling"] = "no successful poll yet"
+        elif poll_age is not None and poll_age > self.max_poll_age:
+            problems["polling"] = f"last poll {poll_age:.0f}s ago"
+        if memory_limit and rss >= NEAR_LIMIT * memory_limit:
+            problems["memory"] = f"RSS {rss / MB:.0f}MB of {memory_limit / MB:.0f}MB"
+        if max_threads and threads >= NEAR_LIMIT * max_threads:
+            problems["threads"] = f"{threads} of {max_threads} threads"
+
+        self.snapshot = {
+            "status": "degraded" if problems else "ok",
+            "problems": list(problems.values()),
+            "time": time.time(),
+            "uptime_s": now - self._started,
+            "memory": {
+                "rss_mb": rss / MB,
+                "peak_rss_mb": peak_rss_bytes() / MB,
+                "limit_mb": memory_limit / MB if memory_limit else None,
+            },
+            "gc": {
+                "pending": list(gc.get_count()),
+                "generations": [
+                    dict(stats, pause_total_ms=total * 1000, pause_max_ms=longest * 1000)
+                    for stats, (total, longest) in zip(gc.get_stats(), self._gc_pauses)
+                ],
+            },
+            "threads": {
+                "active": threads,
+                "limit": max_threads,
+                "dispatcher_utilization": utilization,
+            },
+            "state": {
+                "conversations": self._conversations(),
+                "user_data": len(self.dispatcher.user_data),
+                "chat_data": len(self.dispatcher.chat_data),
+            },
+            "queue": queue,
+            "outbound": outbound,
+            "polling": {"last_poll_age_s": poll_age},
+        }
+
+        for kind in problems.keys() - self._problems:
+            logger.warning("Health degraded: %s", problems[kind])
+        for kind in self._problems - problems.keys():
+            logger.info("Health recovered: %s", kind)
+        self._problems = set(problems)
+        return self.snapshot
+
+    def report(self):
+        """The latest snapshot, taking the first one if needed."""
+        return self.snapshot or self.sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Health sample failed")
+
+    def start(self):
+        """Sample every ``interval`` seconds in a background thread."""
+        gc.callbacks.append(self._on_gc)
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    # HTTP endpoint
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve the latest snapshot as JSON on ``GET /health`` in a background thread."""
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/health"):
+                    self.send_error(404)
+                    return
+                snapshot = monitor.report()
+                body = json.dumps(snapshot).encode()
+                self.send_response(200 if snapshot["status"] == "ok" else 503)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="health-http", daemon=True).start()
+        logger.info("Serving health on http://%s:%d/health", host, port)
+        return self._server
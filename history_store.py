@@ -0,0 +1,165 @@
+"""Append-only history of computed results, stored in SQLite.
+
+Handlers call ``record`` which only puts the row on a queue; a writer thread
+inserts queued rows in batches, one transaction per batch; a batch that fails
+is retried row by row. Reads go through per-thread connections and only use
+indexed per-user range queries, so they stay fast however many rows the table
+holds. WAL mode lets reads run while the writer is inserting.
+"""
+import json
+import logging
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ielts_history.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    skill TEXT NOT NULL,
+    module TEXT,
+    band REAL NOT NULL,
+    details TEXT,
+    table_version TEXT
+);
+CREATE INDEX IF NOT EXISTS results_user_time ON results (user_id, created_at);
+CREATE INDEX IF NOT EXISTS results_user_skill_time ON results (user_id, skill, created_at, band);
+"""
+
+INSERT = (
+    "INSERT INTO results (user_id, created_at, skill, module, band, details, table_version) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """SQLite result history with a batching background writer."""
+
+    def __init__(self, path=None, batch_size=500, flush_interval=0.5):
+        self.path = path or os.getenv("HISTORY_DB_PATH") or DEFAULT_PATH
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._local = threading.local()
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _reader(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    # Writing
+
+    def record(self, user_id, skill, band, module=None, details=None, table_version=None):
+        """Queue a computed result for insertion. Never blocks on the database."""
+        if not math.isfinite(band):
+            logger.warning("Ignored %s band %r for user %s", skill, band, user_id)
+            return
+        self._queue.put((
+            user_id, time.time(), skill, module, band,
+            json.dumps(details) if details is not None else None,
+            table_version,
+        ))
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._insert(connection, batch)
+            for waiter in waiters:
+                waiter.set()
+            if item is None:
+                connection.close()
+                return
+
+    def _insert(self, connection, batch):
+        """Insert a batch in one transaction; if that fails, retry it row by
+        row so a bad row only loses itself."""
+        try:
+            with connection:
+                connection.executemany(INSERT, batch)
+            return
+        except sqlite3.Error:
+            if len(batch) == 1:
+                logger.exception("Dropped a history row for user %s", batch[0][0])
+                return
+        for row in batch:
+            try:
+                with connection:
+                    connection.execute(INSERT, row)
+            except sqlite3.Error:
+                logger.exception("Dropped a history row for user %s", row[0])
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far has been written."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Write the remaining rows and stop the writer thread."""
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    # Reading
+
+    def recent(self, user_id, limit=5):
+        """Return the user's last ``limit`` results, newest first."""
+        return self._reader().execute(
+            "SELECT created_at, skill, module, band FROM results "
+            "WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, limit),
+        ).fetchall()
+
+    def trend(self, user_id, skill, limit=5):
+        """Return the bands of the user's last ``limit`` results for a skill, oldest first."""
+        rows = self._reader().execute(
+            "SELECT band FROM results "
+            "WHERE user_id = ? AND skill = ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, skill, limit),
+        ).fetchall()
+        return [band for band, in reversed(rows)]
+
+    def user_ids(self):
+        """Return the id of every user with a recorded result."""
+        return [user_id for user_id, in self._reader().execute("SELECT DISTINCT user_id FROM results")]
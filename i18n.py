@@ -0,0 +1,116 @@
+"""Localized message catalogs.
+
+Each language is a flat JSON catalog in ``locales/`` mapping message keys to
+``str.format``-style templates. Catalogs are compiled once, on first use:
+
+* every key gets an integer slot, and each locale becomes a tuple of
+  templates indexed by slot (keys a translation lacks fall back to English);
+* each template is pre-split into ``(literal, field, format_spec)`` parts, so
+  rendering is a join with no parsing, and templates without fields are plain
+  strings returned as-is;
+* button labels from every locale are indexed back to their key, so a pressed
+  button is recognised whatever the user's language.
+
+Adding a language only adds a catalog file; lookups cost the same.
+"""
+import json
+import os
+from functools import lru_cache
+from string import Formatter
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+DEFAULT_LOCALE = "en"
+
+# Keys whose text is sent as reply keyboard buttons
+BUTTON_PREFIX = "button_"
+
+
+def compile_template(template):
+    """Split a template into render-ready parts, or keep it as a plain string."""
+    parts = tuple(
+        (literal, field, spec)
+        for literal, field, spec, _ in Formatter().parse(template)
+    )
+    if all(field is None for _, field, _ in parts):
+        return "".join(literal for literal, _, _ in parts)
+    return tuple((literal, field, spec or "") for literal, field, spec in parts)
+
+
+def _fields(compiled):
+    if isinstance(compiled, str):
+        return set()
+    return {field for _, field, _ in compiled if field}
+
+
+class Catalogs:
+    """Compiled message tables for every available locale."""
+
+    def __init__(self, directory=LOCALES_DIR):
+        sources = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json"):
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    sources[name[:-len(".json")]] = json.load(f)
+        default = sources[DEFAULT_LOCALE]
+
+        self.keys = tuple(sorted(default))
+        self.slots = {key: slot for slot, key in enumerate(self.keys)}
+        self.locales = (DEFAULT_LOCALE,) + tuple(code for code in sources if code != DEFAULT_LOCALE)
+        self.tables = {}
+        self.buttons = {}
+
+        for code in self.locales:
+            catalog = sources[code]
+            unknown = set(catalog) - set(default)
+            if unknown:
+                raise ValueError(f"Locale {code} has unknown keys: {', '.join(sorted(unknown))}")
+            table = []
+            for key in self.keys:
+                template = catalog.get(key, default[key])
+                compiled = compile_template(template)
+                unknown = _fields(compiled) - _fields(compile_template(default[key]))
+                if unknown:
+                    raise ValueError(f"Locale {code} uses unknown fields in {key}: {', '.join(sorted(unknown))}")
+                table.append(compiled)
+                if key.startswith(BUTTON_PREFIX):
+                    if self.buttons.setdefault(template, key) != key:
+                        raise ValueError(f"Button label {template!r} is used for two different buttons")
+            self.tables[code] = tuple(table)
+
+    def render(self, locale, key, **values):
+        template = self.tables.get(locale, self.tables[DEFAULT_LOCALE])[self.slots[key]]
+        if isinstance(template, str):
+            return template
+        return "".join(
+            literal + (format(values[field], spec) if field else "")
+            for literal, field, spec in template
+        )
+
+
+@lru_cache(maxsize=None)
+def get_catalogs():
+    """Return the compiled catalogs, compiling them on first use."""
+    return Catalogs()
+
+
+def render(locale, key, **values):
+    """Render message ``key`` in ``locale``."""
+    return get_catalogs().render(locale, key, **values)
+
+
+def button_key(text):
+    """Return the message key of a button label in any locale, or None."""
+    return get_catalogs().buttons.get(text)
+
+
+def available_locales():
+    return get_catalogs().locales
+
+
+def match_locale(language_code):
+    """Pick the closest available locale for a Telegram ``language_code``."""
+    if language_code:
+        code = language_code.split("-")[0].lower()
+        if code in get_catalogs().tables:
+            return code
+    return DEFAULT_LOCALE
@@ -1,26 +1,36 @@
+from __future__ import annotations
+
 import logging
 import math
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
-from telegram.ext import (
-    Updater,
-    CommandHandler,
-    MessageHandler,
-    Filters,
-    ConversationHandler,
-    CallbackContext,
-)
-from dotenv import load_dotenv
 import os
+import threading
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-# Load environment variables
-load_dotenv()
+import analytics
+import history_store
+import i18n
+import language_store
+import score_tables
+import scoring
+import subscribers
+import target_solver
+import update_dedup
+import update_recorder
+import update_scheduler
+
+# Telegram and dotenv are only imported when the bot actually starts, so the
+# scoring modules (and tools that import this file) load almost nothing.
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import CallbackContext
 
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+# END, without importing telegram.ext
+END = -1
+
 # States
 MENU = 0
 
@@ -42,77 +52,74 @@ OVERALL_MODULE = 16
 OVERALL_L_TYPE, OVERALL_L_SCORE = range(17, 19)
 OVERALL_R_TYPE, OVERALL_R_SCORE = range(19, 21)
 OVERALL_W_SCORE, OVERALL_S_SCORE = range(21, 23)
+OVERALL_W_TYPE, OVERALL_W_CRITERIA = range(23, 25)
+OVERALL_S_TYPE, OVERALL_S_CRITERIA = range(25, 27)
+
+# Criteria asked for in the Overall flow, in order
+OVERALL_WRITING_CRITERIA = (
+    (1, 'ta'), (1, 'cc'), (1, 'lr'), (1, 'gra'),
+    (2, 'tr'), (2, 'cc'), (2, 'lr'), (2, 'gra'),
+)
+OVERALL_SPEAKING_CRITERIA = ('fc', 'lr', 'gra', 'pr')
+
+# States whose handler computes a final result, scheduled ahead of the rest
+FINAL_STATES = {LISTENING, READING_SCORE, WRITING_T2_GRA, SPEAKING_PR, OVERALL_S_SCORE, OVERALL_S_CRITERIA}
+
+# Keyboards, as rows of button message keys
+MENU_KEYBOARD = (
+    ("button_listening", "button_reading"),
+    ("button_writing", "button_speaking"),
+    ("button_overall",),
+)
+MODULE_KEYBOARD = (("button_academic", "button_general_training"),)
+SCORE_TYPE_KEYBOARD = (("button_raw_score", "button_band_score"),)
+CRITERIA_TYPE_KEYBOARD = (("button_band_score", "button_criteria"),)
+
+# Module buttons and the module names results are scored and stored under
+MODULE_BUTTONS = {'button_academic': 'Academic', 'button_general_training': 'General Training'}
+MODULE_LABELS = {module: key for key, module in MODULE_BUTTONS.items()}
+
+@lru_cache(maxsize=None)
+def reply_keyboard(rows):
+    """Build (once) a one-time reply keyboard from a tuple of button rows."""
+    from telegram import ReplyKeyboardMarkup
+    return ReplyKeyboardMarkup([list(row) for row in rows], one_time_keyboard=True, resize_keyboard=True)
+
+@lru_cache(maxsize=None)
+def localized_keyboard(locale, rows):
+    """Build (once per locale) a reply keyboard from rows of button message keys."""
+    return reply_keyboard(tuple(tuple(i18n.render(locale, key) for key in row) for row in rows))
+
+@lru_cache(maxsize=None)
+def remove_keyboard():
+    from telegram import ReplyKeyboardRemove
+    return ReplyKeyboardRemove()
 
-# Listening conversion table
-def listening_band(raw_score):
-    if raw_score >= 39: return 9.0
-    elif raw_score >= 37: return 8.5
-    elif raw_score >= 35: return 8.0
-    elif raw_score >= 32: return 7.5
-    elif raw_score >= 30: return 7.0
-    elif raw_score >= 26: return 6.5
-    elif raw_score >= 23: return 6.0
-    elif raw_score >= 18: return 5.5
-    elif raw_score >= 16: return 5.0
-    elif raw_score >= 13: return 4.5
-    elif raw_score >= 10: return 4.0
-    elif raw_score >= 8: return 3.5
-    elif raw_score >= 6: return 3.0
-    elif raw_score >= 4: return 2.5
-    elif raw_score >= 2: return 2.0
-    else: return 1.0
-
-# Reading Academic conversion
-def reading_academic_band(raw_score):
-    if raw_score >= 39: return 9.0
-    elif raw_score >= 37: return 8.5
-    elif raw_score >= 35: return 8.0
-    elif raw_score >= 33: return 7.5
-    elif raw_score >= 30: return 7.0
-    elif raw_score >= 27: return 6.5
-    elif raw_score >= 23: return 6.0
-    elif raw_score >= 19: return 5.5
-    elif raw_score >= 15: return 5.0
-    elif raw_score >= 13: return 4.5
-    elif raw_score >= 10: return 4.0
-    elif raw_score >= 8: return 3.5
-    elif raw_score >= 6: return 3.0
-    elif raw_score >= 4: return 2.5
-    elif raw_score >= 2: return 2.0
-    else: return 1.0
-
-# Reading General Training conversion
-def reading_general_band(raw_score):
-    if raw_score >= 40: return 9.0
-    elif raw_score >= 39: return 8.5
-    elif raw_score >= 37: return 8.0
-    elif raw_score >= 34: return 7.5
-    elif raw_score >= 30: return 7.0
-    elif raw_score >= 26: return 6.5
-    elif raw_score >= 23: return 6.0
-    elif raw_score >= 19: return 5.5
-    elif raw_score >= 15: return 5.0
-    elif raw_score >= 12: return 4.5
-    elif raw_score >= 9: return 4.0
-    elif raw_score >= 6: return 3.5
-    elif raw_score >= 4: return 3.0
-    elif raw_score >= 2: return 2.5
-    else: return 1.0
-
-# Round down to nearest 0.5 (IELTS criteria rounding)
-def round_down_to_half(value):
-    return math.floor(value * 2) / 2
-
-# Round up to nearest 0.5 (IELTS overall rounding)
-def round_up_to_half(value):
-    return math.ceil(value * 2) / 2
+def user_locale(update: Update, context: CallbackContext) -> str:
+    """Return the user's locale: their /language choice, else their Telegram language."""
+    locales = context.bot_data.setdefault('locales', {})
+    user = update.effective_user
+    locale = locales.get(user.id)
+    if locale is None:
+        # First update from this user since the start: look up a stored choice
+        store = context.bot_data.get('languages')
+        chosen = store.get(user.id) if store is not None else None
+        if chosen not in i18n.available_locales():
+            chosen = None
+        locale = locales[user.id] = chosen or i18n.match_locale(user.language_code)
+    return locale
+
+def module_label(locale, module):
+    """Localized name of a module stored under its canonical name."""
+    key = MODULE_LABELS.get(module)
+    return i18n.render(locale, key) if key else module
 
 def start(update: Update, context: CallbackContext) -> int:
     """Start the conversation and show main menu."""
     # Initialize data storage
     context.user_data.clear()
     
-    show_menu(update)
+    show_menu(update, context)
     return MENU
 
 def clear(update: Update, context: CallbackContext) -> int:
@@ -120,342 +127,422 @@ def clear(update: Update, context: CallbackContext) -> int:
     context.user_data.clear()
     
     update.message.reply_text(
-        "✅ Conversation history has been cleared.\n\n"
-        "Type /start to begin a new calculation.",
+        i18n.render(user_locale(update, context), 'cleared'),
         parse_mode="Markdown",
-        reply_markup=ReplyKeyboardRemove()
+        reply_markup=remove_keyboard()
     )
     
-    return ConversationHandler.END
+    return END
 
-def show_menu(update: Update):
+def show_menu(update: Update, context: CallbackContext):
     """Show the main menu keyboard."""
-    reply_keyboard = [
-        ["🎧 Listening", "📖 Reading"],
-        ["✍️ Writing", "🗣️ Speaking"],
-        ["📊 Overall Score"]
-    ]
-    
+    locale = user_locale(update, context)
     update.message.reply_text(
-        "*Welcome to the IELTS Score Calculator Bot!* 📊\n\n"
-        "Please select what you'd like to calculate:",
+        i18n.render(locale, 'welcome'),
         parse_mode="Markdown",
-        reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True),
+        reply_markup=localized_keyboard(locale, MENU_KEYBOARD),
     )
 
 def menu_choice(update: Update, context: CallbackContext) -> int:
     """Handle menu choices."""
-    text = update.message.text
+    locale = user_locale(update, context)
+    choice = i18n.button_key(update.message.text)
     
-    if "🎧 Listening" in text:
+    if choice == 'button_listening':
         update.message.reply_text(
-            "Please enter your raw *LISTENING* score (0 - 40):",
+            i18n.render(locale, 'ask_listening_raw'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
         return LISTENING
     
-    elif "📖 Reading" in text:
-        reply_keyboard = [["Academic", "General Training"]]
+    elif choice == 'button_reading':
         update.message.reply_text(
-            "Please select your IELTS module:",
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+            i18n.render(locale, 'ask_module'),
+            reply_markup=localized_keyboard(locale, MODULE_KEYBOARD)
         )
         return READING_MODULE
     
-    elif "✍️ Writing" in text:
+    elif choice == 'button_writing':
         update.message.reply_text(
-            "Let's calculate your *WRITING* score.",
+            i18n.render(locale, 'writing_intro'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
         
         update.message.reply_text(
-            "*__Task 1__*\n\n"
-            "Please enter your *Task Achievement (TA)* score (1.0 - 9.0):",
+            i18n.render(
+                locale, 'ask_task_criterion',
+                task=i18n.render(locale, 'task_1'), criterion=i18n.render(locale, 'criterion_ta'),
+            ),
             parse_mode="Markdown"
         )
         return WRITING_T1_TA
     
-    elif "🗣️ Speaking" in text:
+    elif choice == 'button_speaking':
         update.message.reply_text(
-            "Let's calculate your *SPEAKING* score.\n\n"
-            "Please enter your *Fluency & Coherence (FC)* score (1.0 - 9.0):",
+            i18n.render(locale, 'speaking_intro', criterion=i18n.render(locale, 'criterion_fc')),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
         return SPEAKING_FC
     
-    elif "📊 Overall Score" in text:
-        reply_keyboard = [["Academic", "General Training"]]
+    elif choice == 'button_overall':
         update.message.reply_text(
-            "Let's calculate your overall IELTS score.\n\n"
-            "First, please select your IELTS module:",
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+            i18n.render(locale, 'overall_intro'),
+            reply_markup=localized_keyboard(locale, MODULE_KEYBOARD)
         )
         return OVERALL_MODULE
     
     else:
-        show_menu(update)
+        show_menu(update, context)
         return MENU
 
-# Validate band scores for Writing and Speaking
+def get_score_tables(context: CallbackContext):
+    """Return the active score tables and record their version for this result."""
+    tables = score_tables.get_tables()
+    context.user_data['table_version'] = tables.version
+    return tables
+
+def record_result(update: Update, context: CallbackContext, skill, band, module=None, **details) -> None:
+    """Add a computed result to the analytics rollups and the history store."""
+    rollups = context.bot_data.get('analytics')
+    if rollups is not None:
+        rollups.add(skill, band, module)
+    
+    store = context.bot_data.get('history')
+    if store is None:
+        return
+    store.record(
+        update.effective_user.id, skill, band, module=module,
+        details=details or None, table_version=context.user_data.get('table_version'),
+    )
+
+def update_priority(update):
+    """Return the scheduling lane and priority class for a queued update."""
+    chat = getattr(update, 'effective_chat', None)
+    user = getattr(update, 'effective_user', None)
+    if chat is None or user is None:
+        return None, update_scheduler.FINAL
+    
+    key = (chat.id, user.id)
+    state = build_conversation_handler().conversations.get(key)
+    if state is None:
+        return key, update_scheduler.NEW
+    if state in FINAL_STATES:
+        return key, update_scheduler.FINAL
+    return key, update_scheduler.CONVERSATION
+
+def drop_duplicate_updates(update: Update, context: CallbackContext) -> None:
+    """Stop redelivered updates before they reach the conversation handler."""
+    from telegram.ext import DispatcherHandlerStop
+    
+    dedup = context.bot_data['dedup']
+    message = update.message
+    if message is None:
+        duplicate = dedup.is_duplicate(update.update_id)
+    else:
+        sender = message.from_user.id if message.from_user else None
+        duplicate = dedup.is_duplicate(update.update_id, message.chat_id, message.message_id, sender)
+    
+    if duplicate:
+        logger.info("Dropped duplicate update %s", update.update_id)
+        raise DispatcherHandlerStop()
+
+def record_update(update: Update, context: CallbackContext) -> None:
+    """Append the update to the replay log (only registered when recording)."""
+    context.bot_data['recorder'].record(update)
+
+def register_chat(update: Update, context: CallbackContext) -> None:
+    """Add the update's chat to the broadcast subscribers."""
+    if update.effective_chat is not None:
+        context.bot_data['subscribers'].add(update.effective_chat.id)
+
+# Validate band scores for Writing and Speaking; errors are message keys
 def validate_band_score(score_text):
     try:
         score = float(score_text)
+        # "nan" and "inf" parse as floats but are not numbers a user can score
+        if not math.isfinite(score):
+            return None, 'error_band_number'
         if score < 1.0 or score > 9.0:
-            return None, "Please enter a valid band score between 1.0 and 9.0."
+            return None, 'error_band_range'
         return score, None
     except ValueError:
-        return None, "Please enter a valid number (example: 6.5)."
+        return None, 'error_band_number'
 
 # LISTENING SECTION
 def listening_score(update: Update, context: CallbackContext) -> int:
     """Process listening raw score."""
+    locale = user_locale(update, context)
     try:
         score = int(update.message.text)
         if 0 <= score <= 40:
-            band_score = listening_band(score)
-            
-            result_message = f"🎧 *IELTS LISTENING Band Score*\n\n"
-            result_message += f"Raw score: {score}/40\n"
-            result_message += f"Band score: {band_score}"
+            band_score = get_score_tables(context).listening_band(score)
             
-            update.message.reply_text(result_message, parse_mode="Markdown")
+            update.message.reply_text(
+                i18n.render(locale, 'listening_result', score=score, band=band_score),
+                parse_mode="Markdown"
+            )
+            record_result(update, context, 'listening', band_score, raw=score)
             
             # End conversation with instruction to restart
             update.message.reply_text(
-                "If you want to calculate again, use the /start command.",
-                reply_markup=ReplyKeyboardRemove()
+                i18n.render(locale, 'calculate_again'),
+                reply_markup=remove_keyboard()
             )
             
-            return ConversationHandler.END
+            return END
         else:
-            update.message.reply_text("Please enter a valid score between 0 and 40.")
+            update.message.reply_text(i18n.render(locale, 'error_raw_range'))
             return LISTENING
     except ValueError:
-        update.message.reply_text("Please enter a valid number between 0 and 40.")
+        update.message.reply_text(i18n.render(locale, 'error_raw_number'))
         return LISTENING
 
 # READING SECTION
 def reading_module(update: Update, context: CallbackContext) -> int:
     """Handle reading module selection."""
-    module = update.message.text
+    locale = user_locale(update, context)
+    module = MODULE_BUTTONS.get(i18n.button_key(update.message.text))
     
-    if module in ["Academic", "General Training"]:
+    if module:
         context.user_data['module'] = module
         
         # First message with confirmation
         update.message.reply_text(
-            f"✅ You selected: {module}",
+            i18n.render(locale, 'module_selected', module=module_label(locale, module)),
             parse_mode="Markdown"
         )
         
         # Second message with next step
         update.message.reply_text(
-            "Please enter your raw *READING* score (0 - 40):",
+            i18n.render(locale, 'ask_reading_raw'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
         
         return READING_SCORE
     else:
-        reply_keyboard = [["Academic", "General Training"]]
         update.message.reply_text(
-            "Please select a valid module using the keyboard buttons.",
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+            i18n.render(locale, 'error_module'),
+            reply_markup=localized_keyboard(locale, MODULE_KEYBOARD)
         )
         return READING_MODULE
 
 def reading_score(update: Update, context: CallbackContext) -> int:
     """Process reading raw score."""
+    locale = user_locale(update, context)
     try:
         score = int(update.message.text)
         if 0 <= score <= 40:
             module = context.user_data.get('module', 'Academic')
             
-            if module == "Academic":
-                band_score = reading_academic_band(score)
-            else:
-                band_score = reading_general_band(score)
-            
-            result_message = f"📖 *IELTS READING Band Score*\n\n"
-            result_message += f"Module: {module}\n"
-            result_message += f"Raw score: {score}/40\n"
-            result_message += f"Band score: {band_score}"
+            band_score = get_score_tables(context).reading_band(module, score)
             
-            update.message.reply_text(result_message, parse_mode="Markdown")
+            update.message.reply_text(
+                i18n.render(
+                    locale, 'reading_result',
+                    module=module_label(locale, module), score=score, band=band_score,
+                ),
+                parse_mode="Markdown"
+            )
+            record_result(update, context, 'reading', band_score, module=module, raw=score)
             
             # End conversation with instruction to restart
             update.message.reply_text(
-                "If you want to calculate again, use the /start command.",
-                reply_markup=ReplyKeyboardRemove()
+                i18n.render(locale, 'calculate_again'),
+                reply_markup=remove_keyboard()
             )
             
-            return ConversationHandler.END
+            return END
         else:
-            update.message.reply_text("Please enter a valid score between 0 and 40.")
+            update.message.reply_text(i18n.render(locale, 'error_raw_range'))
             return READING_SCORE
     except ValueError:
-        update.message.reply_text("Please enter a valid number between 0 and 40.")
+        update.message.reply_text(i18n.render(locale, 'error_raw_number'))
         return READING_SCORE
 
 # WRITING SECTION
 def writing_t1_ta(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     if not context.user_data.get('writing'):
         context.user_data['writing'] = {}
     
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T1_TA
     
     context.user_data['writing']['t1_ta'] = score
     
     update.message.reply_text(
-        f"✅ *__Task 1__*\n\n"
-        f"*Task Achievement (TA)*: {score}",
+        i18n.render(
+            locale, 'task_criterion_confirm', task=i18n.render(locale, 'task_1'),
+            criterion=i18n.render(locale, 'criterion_ta'), score=score,
+        ),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Coherence & Cohesion (CC)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_cc')),
         parse_mode="Markdown"
     )
     
     return WRITING_T1_CC
 
 def writing_t1_cc(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T1_CC
     
     context.user_data['writing']['t1_cc'] = score
     
     update.message.reply_text(
-        f"✅ *__Task 1__*\n\n"
-        f"*Coherence & Cohesion (CC)*: {score}",
+        i18n.render(
+            locale, 'task_criterion_confirm', task=i18n.render(locale, 'task_1'),
+            criterion=i18n.render(locale, 'criterion_cc'), score=score,
+        ),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Lexical Resource (LR)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_lr')),
         parse_mode="Markdown"
     )
     
     return WRITING_T1_LR
 
 def writing_t1_lr(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T1_LR
     
     context.user_data['writing']['t1_lr'] = score
     
     update.message.reply_text(
-        f"✅ *__Task 1__*\n\n"
-        f"*Lexical Resource (LR)*: {score}",
+        i18n.render(
+            locale, 'task_criterion_confirm', task=i18n.render(locale, 'task_1'),
+            criterion=i18n.render(locale, 'criterion_lr'), score=score,
+        ),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Grammatical Range & Accuracy (GRA)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_gra')),
         parse_mode="Markdown"
     )
     
     return WRITING_T1_GRA
 
 def writing_t1_gra(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T1_GRA
     
     context.user_data['writing']['t1_gra'] = score
     
     update.message.reply_text(
-        f"✅ *__Task 1__*\n\n"
-        f"*Grammatical Range & Accuracy (GRA)*: {score}",
+        i18n.render(
+            locale, 'task_criterion_confirm', task=i18n.render(locale, 'task_1'),
+            criterion=i18n.render(locale, 'criterion_gra'), score=score,
+        ),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "*__Task 2__*\n\n"
-        "Please enter your *Task Response (TR)* score (1.0 - 9.0):",
+        i18n.render(
+            locale, 'ask_task_criterion',
+            task=i18n.render(locale, 'task_2'), criterion=i18n.render(locale, 'criterion_tr'),
+        ),
         parse_mode="Markdown"
     )
     
     return WRITING_T2_TR
 
 def writing_t2_tr(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T2_TR
     
     context.user_data['writing']['t2_tr'] = score
     
     update.message.reply_text(
-        f"✅ *__Task 2__*\n\n"
-        f"*Task Response (TR)*: {score}",
+        i18n.render(
+            locale, 'task_criterion_confirm', task=i18n.render(locale, 'task_2'),
+            criterion=i18n.render(locale, 'criterion_tr'), score=score,
+        ),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Coherence & Cohesion (CC)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_cc')),
         parse_mode="Markdown"
     )
     
     return WRITING_T2_CC
 
 def writing_t2_cc(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T2_CC
     
     context.user_data['writing']['t2_cc'] = score
     
     update.message.reply_text(
-        f"✅ *__Task 2__*\n\n"
-        f"*Coherence & Cohesion (CC)*: {score}",
+        i18n.render(
+            locale, 'task_criterion_confirm', task=i18n.render(locale, 'task_2'),
+            criterion=i18n.render(locale, 'criterion_cc'), score=score,
+        ),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Lexical Resource (LR)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_lr')),
         parse_mode="Markdown"
     )
     
     return WRITING_T2_LR
 
 def writing_t2_lr(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T2_LR
     
     context.user_data['writing']['t2_lr'] = score
     
     update.message.reply_text(
-        f"✅ *__Task 2__*\n\n"
-        f"*Lexical Resource (LR)*: {score}",
+        i18n.render(
+            locale, 'task_criterion_confirm', task=i18n.render(locale, 'task_2'),
+            criterion=i18n.render(locale, 'criterion_lr'), score=score,
+        ),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Grammatical Range & Accuracy (GRA)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_gra')),
         parse_mode="Markdown"
     )
     
     return WRITING_T2_GRA
 
 def writing_t2_gra(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return WRITING_T2_GRA
     
     context.user_data['writing']['t2_gra'] = score
@@ -470,8 +557,8 @@ def writing_t2_gra(update: Update, context: CallbackContext) -> int:
         writing_data['t1_lr'],
         writing_data['t1_gra']
     ]
-    t1_average = sum(t1_scores) / len(t1_scores)
-    t1_score = round_down_to_half(t1_average)
+    tables = get_score_tables(context)
+    t1_score = tables.criteria_band(t1_scores)
     
     # Calculate Task 2 score (rounded DOWN)
     t2_scores = [
@@ -480,99 +567,97 @@ def writing_t2_gra(update: Update, context: CallbackContext) -> int:
         writing_data['t2_lr'],
         writing_data['t2_gra']
     ]
-    t2_average = sum(t2_scores) / len(t2_scores)
-    t2_score = round_down_to_half(t2_average)
+    t2_score = tables.criteria_band(t2_scores)
     
     # Calculate overall Writing score (Task 1 is 1/3, Task 2 is 2/3, rounded UP)
-    overall_writing = (t1_score * 1/3) + (t2_score * 2/3)
-    overall_writing_score = round_up_to_half(overall_writing)
-    
-    result_message = f"✍️ *IELTS WRITING Band Score*\n\n"
-    result_message += f"*Task 1 Score:* {t1_score}\n"
-    result_message += f"*Task 2 Score:* {t2_score}\n\n"
-    result_message += f"*Overall Writing Score:* {overall_writing_score}"
+    overall_writing_score = tables.writing_band(t1_score, t2_score)
     
     update.message.reply_text(
-        result_message,
+        i18n.render(locale, 'writing_result', t1=t1_score, t2=t2_score, band=overall_writing_score),
         parse_mode="Markdown",
     )
+    record_result(update, context, 'writing', overall_writing_score, task1=t1_score, task2=t2_score, **writing_data)
     
     # End conversation with instruction to restart
     update.message.reply_text(
-        "If you want to calculate again, use the /start command.",
-        reply_markup=ReplyKeyboardRemove()
+        i18n.render(locale, 'calculate_again'),
+        reply_markup=remove_keyboard()
     )
     
-    return ConversationHandler.END
+    return END
 
 # SPEAKING SECTION
 def speaking_fc(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     if not context.user_data.get('speaking'):
         context.user_data['speaking'] = {}
     
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return SPEAKING_FC
     
     context.user_data['speaking']['fc'] = score
     
     update.message.reply_text(
-        f"✅ *Fluency & Coherence (FC)*: {score}",
+        i18n.render(locale, 'criterion_confirm', criterion=i18n.render(locale, 'criterion_fc'), score=score),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Lexical Resource (LR)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_lr')),
         parse_mode="Markdown"
     )
     
     return SPEAKING_LR
 
 def speaking_lr(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return SPEAKING_LR
     
     context.user_data['speaking']['lr'] = score
     
     update.message.reply_text(
-        f"✅ *Lexical Resource (LR)*: {score}",
+        i18n.render(locale, 'criterion_confirm', criterion=i18n.render(locale, 'criterion_lr'), score=score),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Grammatical Range & Accuracy (GRA)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_gra')),
         parse_mode="Markdown"
     )
     
     return SPEAKING_GRA
 
 def speaking_gra(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return SPEAKING_GRA
     
     context.user_data['speaking']['gra'] = score
     
     update.message.reply_text(
-        f"✅ *Grammatical Range & Accuracy (GRA)*: {score}",
+        i18n.render(locale, 'criterion_confirm', criterion=i18n.render(locale, 'criterion_gra'), score=score),
         parse_mode="Markdown"
     )
     
     update.message.reply_text(
-        "Please enter your *Pronunciation (Pr)* score (1.0 - 9.0):",
+        i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, 'criterion_pr')),
         parse_mode="Markdown"
     )
     
     return SPEAKING_PR
 
 def speaking_pr(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return SPEAKING_PR
     
     context.user_data['speaking']['pr'] = score
@@ -589,106 +674,114 @@ def speaking_pr(update: Update, context: CallbackContext) -> int:
     ]
     
     # Calculate average and round DOWN as specified
-    average = sum(scores) / len(scores)
-    speaking_score = round_down_to_half(average)
-    
-    result_message = f"🗣️ *IELTS SPEAKING Band Score*\n\n"
-    result_message += f"*Fluency & Coherence*: {speaking_data['fc']}\n"
-    result_message += f"*Lexical Resource*: {speaking_data['lr']}\n"
-    result_message += f"*Grammatical Range & Accuracy*: {speaking_data['gra']}\n"
-    result_message += f"*Pronunciation*: {speaking_data['pr']}\n\n"
-    result_message += f"*Overall Speaking Score:* {speaking_score}"
+    speaking_score = get_score_tables(context).criteria_band(scores)
     
     update.message.reply_text(
-        result_message,
+        i18n.render(locale, 'speaking_result', band=speaking_score, **speaking_data),
         parse_mode="Markdown",
     )
+    record_result(update, context, 'speaking', speaking_score, **speaking_data)
     
     # End conversation with instruction to restart
     update.message.reply_text(
-        "If you want to calculate again, use the /start command.", 
-        reply_markup=ReplyKeyboardRemove()
+        i18n.render(locale, 'calculate_again'),
+        reply_markup=remove_keyboard()
     )
     
-    return ConversationHandler.END
+    return END
 
 # OVERALL SCORE SECTION
 def overall_module(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     if not context.user_data.get('overall'):
         context.user_data['overall'] = {}
     
-    module = update.message.text
+    module = MODULE_BUTTONS.get(i18n.button_key(update.message.text))
     
-    if module in ["Academic", "General Training"]:
+    if module:
         context.user_data['overall']['module'] = module
         
         # First message with confirmation
         update.message.reply_text(
-            f"✅ You selected: {module} module",
+            i18n.render(locale, 'overall_module_selected', module=module_label(locale, module)),
             parse_mode="Markdown"
         )
         
         # Second message asking for listening type
-        reply_keyboard = [["Raw Score (0 - 40)", "Band Score (1.0 - 9.0)"]]
         update.message.reply_text(
-            "For *LISTENING*, do you want to enter a raw score or band score?",
+            i18n.render(locale, 'ask_listening_type'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+            reply_markup=localized_keyboard(locale, SCORE_TYPE_KEYBOARD)
         )
         
         return OVERALL_L_TYPE
     else:
-        reply_keyboard = [["Academic", "General Training"]]
         update.message.reply_text(
-            "Please select a valid module using the keyboard buttons.",
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+            i18n.render(locale, 'error_module'),
+            reply_markup=localized_keyboard(locale, MODULE_KEYBOARD)
         )
         return OVERALL_MODULE
 
 def overall_listening_type(update: Update, context: CallbackContext) -> int:
-    choice = update.message.text
+    locale = user_locale(update, context)
+    choice = i18n.button_key(update.message.text)
     
-    if "Raw Score" in choice:
+    if choice == 'button_raw_score':
         context.user_data['overall']['listening_type'] = 'raw'
         
         # Confirmation message
         update.message.reply_text(
-            "✅ You selected: Raw Score input",
+            i18n.render(locale, 'raw_selected'),
             parse_mode="Markdown"
         )
         
         # Request input message
         update.message.reply_text(
-            "Please enter your raw *LISTENING* score (0 - 40):",
+            i18n.render(locale, 'ask_listening_raw'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
-    elif "Band Score" in choice:
+    elif choice == 'button_band_score':
         context.user_data['overall']['listening_type'] = 'band'
         
         # Confirmation message
         update.message.reply_text(
-            "✅ You selected: Band Score input",
+            i18n.render(locale, 'band_selected'),
             parse_mode="Markdown"
         )
         
         # Request input message
         update.message.reply_text(
-            "Please enter your *LISTENING* band score (1.0 - 9.0):",
+            i18n.render(locale, 'ask_listening_band'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
     else:
-        reply_keyboard = [["Raw Score (0 - 40)", "Band Score (1.0 - 9.0)"]]
         update.message.reply_text(
-            "Please select a valid option.",
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+            i18n.render(locale, 'error_option'),
+            reply_markup=localized_keyboard(locale, SCORE_TYPE_KEYBOARD)
         )
         return OVERALL_L_TYPE
     
     return OVERALL_L_SCORE
 
+def add_overall_skill(context: CallbackContext, skill, band):
+    """Store a skill band in the Overall flow and return the running partial overall.
+    
+    The partial is kept as a running total, so each skill adds one band
+    instead of recomputing from every stored score.
+    """
+    overall = context.user_data['overall']
+    overall[skill] = band
+    overall['total'] = overall.get('total', 0.0) + band
+    overall['count'] = overall.get('count', 0) + 1
+    return scoring.round_up_to_half(overall['total'] / overall['count'])
+
+def overall_partial_message(locale, context: CallbackContext, partial):
+    return i18n.render(locale, 'overall_partial', band=partial, count=context.user_data['overall']['count'])
+
 def overall_listening_score(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     listening_type = context.user_data['overall'].get('listening_type', 'band')
     
     try:
@@ -698,99 +791,100 @@ def overall_listening_score(update: Update, context: CallbackContext) -> int:
         if listening_type == 'raw':
             if 0 <= score <= 40:
                 # Convert raw score to band score
-                band_score = listening_band(int(score))
-                context.user_data['overall']['listening'] = band_score
+                band_score = get_score_tables(context).listening_band(int(score))
+                partial = add_overall_skill(context, 'listening', band_score)
                 
                 # First message with confirmation
                 update.message.reply_text(
-                    f"✅ *LISTENING* raw score: {int(score)}/40 → Band score: {band_score}",
+                    i18n.render(locale, 'listening_raw_confirm', score=int(score), band=band_score)
+                    + "\n\n" + overall_partial_message(locale, context, partial),
                     parse_mode="Markdown"
                 )
                 
                 # Second message asking for reading type
-                reply_keyboard = [["Raw Score (0 - 40)", "Band Score (1.0 - 9.0)"]]
                 update.message.reply_text(
-                    "For *READING*, do you want to enter a raw score or band score?",
+                    i18n.render(locale, 'ask_reading_type'),
                     parse_mode="Markdown",
-                    reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+                    reply_markup=localized_keyboard(locale, SCORE_TYPE_KEYBOARD)
                 )
                 
                 return OVERALL_R_TYPE
             else:
-                update.message.reply_text("Please enter a valid raw score between 0 and 40.")
+                update.message.reply_text(i18n.render(locale, 'error_raw_range_overall'))
                 return OVERALL_L_SCORE
-                
+        
         elif listening_type == 'band':
             if 1.0 <= score <= 9.0:
                 # Store band score directly
-                context.user_data['overall']['listening'] = score
+                partial = add_overall_skill(context, 'listening', score)
                 
                 # First message with confirmation
                 update.message.reply_text(
-                    f"✅ *LISTENING* band score: {score}",
+                    i18n.render(locale, 'listening_band_confirm', score=score)
+                    + "\n\n" + overall_partial_message(locale, context, partial),
                     parse_mode="Markdown"
                 )
                 
                 # Second message asking for reading type
-                reply_keyboard = [["Raw Score (0 - 40)", "Band Score (1.0 - 9.0)"]]
                 update.message.reply_text(
-                    "For *READING*, do you want to enter a raw score or band score?",
+                    i18n.render(locale, 'ask_reading_type'),
                     parse_mode="Markdown",
-                    reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+                    reply_markup=localized_keyboard(locale, SCORE_TYPE_KEYBOARD)
                 )
                 
                 return OVERALL_R_TYPE
             else:
-                update.message.reply_text("Please enter a valid band score between 1.0 and 9.0.")
+                update.message.reply_text(i18n.render(locale, 'error_band_range'))
                 return OVERALL_L_SCORE
     except ValueError:
-        update.message.reply_text("Please enter a valid number.")
+        update.message.reply_text(i18n.render(locale, 'error_number'))
         return OVERALL_L_SCORE
 
 def overall_reading_type(update: Update, context: CallbackContext) -> int:
-    choice = update.message.text
+    locale = user_locale(update, context)
+    choice = i18n.button_key(update.message.text)
     
-    if "Raw Score" in choice:
+    if choice == 'button_raw_score':
         context.user_data['overall']['reading_type'] = 'raw'
         
         # Confirmation message
         update.message.reply_text(
-            "✅ You selected: Raw Score input",
+            i18n.render(locale, 'raw_selected'),
             parse_mode="Markdown"
         )
         
         # Request input message
         update.message.reply_text(
-            "Please enter your raw *READING* score (0 - 40):",
+            i18n.render(locale, 'ask_reading_raw'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
-    elif "Band Score" in choice:
+    elif choice == 'button_band_score':
         context.user_data['overall']['reading_type'] = 'band'
         
         # Confirmation message
         update.message.reply_text(
-            "✅ You selected: Band Score input",
+            i18n.render(locale, 'band_selected'),
             parse_mode="Markdown"
         )
         
         # Request input message
         update.message.reply_text(
-            "Please enter your *READING* band score (1.0 - 9.0):",
+            i18n.render(locale, 'ask_reading_band'),
             parse_mode="Markdown",
-            reply_markup=ReplyKeyboardRemove()
+            reply_markup=remove_keyboard()
         )
     else:
-        reply_keyboard = [["Raw Score (0 - 40)", "Band Score (1.0 - 9.0)"]]
         update.message.reply_text(
-            "Please select a valid option.",
-            reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True, resize_keyboard=True)
+            i18n.render(locale, 'error_option'),
+            reply_markup=localized_keyboard(locale, SCORE_TYPE_KEYBOARD)
         )
         return OVERALL_R_TYPE
     
     return OVERALL_R_SCORE
 
 def overall_reading_score(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     reading_type = context.user_data['overall'].get('reading_type', 'band')
     module = context.user_data['overall'].get('module', 'Academic')
     
@@ -801,84 +895,207 @@ def overall_reading_score(update: Update, context: CallbackContext) -> int:
         if reading_type == 'raw':
             if 0 <= score <= 40:
                 # Convert raw score to band score based on module
-                if module == 'Academic':
-                    band_score = reading_academic_band(int(score))
-                else:
-                    band_score = reading_general_band(int(score))
-                
-                context.user_data['overall']['reading'] = band_score
-                
-                # First message with confirmation
-                update.message.reply_text(
-                    f"✅ *READING* raw score: {int(score)}/40 → Band score: {band_score}",
-                    parse_mode="Markdown"
-                )
-                
-                # Second message asking for writing score
-                update.message.reply_text(
-                    "Please enter your *WRITING* band score (1.0 - 9.0):",
-                    parse_mode="Markdown"
-                )
-                
-                return OVERALL_W_SCORE
+                band_score = get_score_tables(context).reading_band(module, int(score))
+                partial = add_overall_skill(context, 'reading', band_score)
+                confirmation = i18n.render(locale, 'reading_raw_confirm', score=int(score), band=band_score)
             else:
-                update.message.reply_text("Please enter a valid raw score between 0 and 40.")
+                update.message.reply_text(i18n.render(locale, 'error_raw_range_overall'))
                 return OVERALL_R_SCORE
-                
+        
         elif reading_type == 'band':
             if 1.0 <= score <= 9.0:
                 # Store band score directly
-                context.user_data['overall']['reading'] = score
-                
-                # First message with confirmation
-                update.message.reply_text(
-                    f"✅ *READING* band score: {score}",
-                    parse_mode="Markdown"
-                )
-                
-                # Second message asking for writing score
-                update.message.reply_text(
-                    "Please enter your *WRITING* band score (1.0 - 9.0):",
-                    parse_mode="Markdown"
-                )
-                
-                return OVERALL_W_SCORE
+                partial = add_overall_skill(context, 'reading', score)
+                confirmation = i18n.render(locale, 'reading_band_confirm', score=score)
             else:
-                update.message.reply_text("Please enter a valid band score between 1.0 and 9.0.")
+                update.message.reply_text(i18n.render(locale, 'error_band_range'))
                 return OVERALL_R_SCORE
     except ValueError:
-        update.message.reply_text("Please enter a valid number.")
+        update.message.reply_text(i18n.render(locale, 'error_number'))
         return OVERALL_R_SCORE
+    
+    # First message with confirmation
+    update.message.reply_text(
+        confirmation + "\n\n" + overall_partial_message(locale, context, partial),
+        parse_mode="Markdown"
+    )
+    
+    # Second message asking how to enter the writing score
+    update.message.reply_text(
+        i18n.render(locale, 'ask_writing_type'),
+        parse_mode="Markdown",
+        reply_markup=localized_keyboard(locale, CRITERIA_TYPE_KEYBOARD)
+    )
+    
+    return OVERALL_W_TYPE
+
+def overall_writing_type(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
+    choice = i18n.button_key(update.message.text)
+    
+    if choice == 'button_band_score':
+        update.message.reply_text(
+            i18n.render(locale, 'ask_writing_band'),
+            parse_mode="Markdown",
+            reply_markup=remove_keyboard()
+        )
+        return OVERALL_W_SCORE
+    elif choice == 'button_criteria':
+        context.user_data['overall']['writing_criteria'] = []
+        
+        task, criterion = OVERALL_WRITING_CRITERIA[0]
+        update.message.reply_text(
+            i18n.render(
+                locale, 'ask_task_criterion',
+                task=i18n.render(locale, f'task_{task}'), criterion=i18n.render(locale, f'criterion_{criterion}'),
+            ),
+            parse_mode="Markdown",
+            reply_markup=remove_keyboard()
+        )
+        return OVERALL_W_CRITERIA
+    else:
+        update.message.reply_text(
+            i18n.render(locale, 'error_option'),
+            reply_markup=localized_keyboard(locale, CRITERIA_TYPE_KEYBOARD)
+        )
+        return OVERALL_W_TYPE
+
+def overall_writing_criteria(update: Update, context: CallbackContext) -> int:
+    """Collect the eight Writing criteria scores, one message at a time."""
+    locale = user_locale(update, context)
+    score, error = validate_band_score(update.message.text)
+    if error:
+        update.message.reply_text(i18n.render(locale, error))
+        return OVERALL_W_CRITERIA
+    
+    criteria = context.user_data['overall']['writing_criteria']
+    criteria.append(score)
+    task, criterion = OVERALL_WRITING_CRITERIA[len(criteria) - 1]
+    confirmation = i18n.render(
+        locale, 'task_criterion_confirm', task=i18n.render(locale, f'task_{task}'),
+        criterion=i18n.render(locale, f'criterion_{criterion}'), score=score,
+    )
+    
+    if len(criteria) < len(OVERALL_WRITING_CRITERIA):
+        next_task, next_criterion = OVERALL_WRITING_CRITERIA[len(criteria)]
+        update.message.reply_text(
+            confirmation + "\n\n" + i18n.render(
+                locale, 'ask_task_criterion',
+                task=i18n.render(locale, f'task_{next_task}'), criterion=i18n.render(locale, f'criterion_{next_criterion}'),
+            ),
+            parse_mode="Markdown"
+        )
+        return OVERALL_W_CRITERIA
+    
+    # Task 1 is 1/3 and Task 2 is 2/3 of the Writing band
+    tables = get_score_tables(context)
+    t1_score = tables.criteria_band(criteria[:4])
+    t2_score = tables.criteria_band(criteria[4:])
+    writing_score = tables.writing_band(t1_score, t2_score)
+    partial = add_overall_skill(context, 'writing', writing_score)
+    
+    update.message.reply_text(
+        i18n.render(locale, 'writing_tasks_confirm', band=writing_score, t1=t1_score, t2=t2_score)
+        + "\n\n" + overall_partial_message(locale, context, partial),
+        parse_mode="Markdown"
+    )
+    
+    update.message.reply_text(
+        i18n.render(locale, 'ask_speaking_type'),
+        parse_mode="Markdown",
+        reply_markup=localized_keyboard(locale, CRITERIA_TYPE_KEYBOARD)
+    )
+    
+    return OVERALL_S_TYPE
 
 def overall_writing_score(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return OVERALL_W_SCORE
     
-    context.user_data['overall']['writing'] = score
+    partial = add_overall_skill(context, 'writing', score)
     
     # First message with confirmation
     update.message.reply_text(
-        f"✅ *WRITING* band score: {score}",
+        i18n.render(locale, 'writing_band_confirm', score=score)
+        + "\n\n" + overall_partial_message(locale, context, partial),
         parse_mode="Markdown"
     )
     
-    # Second message asking for speaking score
+    # Second message asking how to enter the speaking score
     update.message.reply_text(
-        "Please enter your *SPEAKING* band score (1.0 - 9.0):",
-        parse_mode="Markdown"
+        i18n.render(locale, 'ask_speaking_type'),
+        parse_mode="Markdown",
+        reply_markup=localized_keyboard(locale, CRITERIA_TYPE_KEYBOARD)
     )
     
-    return OVERALL_S_SCORE
+    return OVERALL_S_TYPE
+
+def overall_speaking_type(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
+    choice = i18n.button_key(update.message.text)
+    
+    if choice == 'button_band_score':
+        update.message.reply_text(
+            i18n.render(locale, 'ask_speaking_band'),
+            parse_mode="Markdown",
+            reply_markup=remove_keyboard()
+        )
+        return OVERALL_S_SCORE
+    elif choice == 'button_criteria':
+        context.user_data['overall']['speaking_criteria'] = []
+        
+        update.message.reply_text(
+            i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, f'criterion_{OVERALL_SPEAKING_CRITERIA[0]}')),
+            parse_mode="Markdown",
+            reply_markup=remove_keyboard()
+        )
+        return OVERALL_S_CRITERIA
+    else:
+        update.message.reply_text(
+            i18n.render(locale, 'error_option'),
+            reply_markup=localized_keyboard(locale, CRITERIA_TYPE_KEYBOARD)
+        )
+        return OVERALL_S_TYPE
+
+def overall_speaking_criteria(update: Update, context: CallbackContext) -> int:
+    """Collect the four Speaking criteria scores, then show the overall result."""
+    locale = user_locale(update, context)
+    score, error = validate_band_score(update.message.text)
+    if error:
+        update.message.reply_text(i18n.render(locale, error))
+        return OVERALL_S_CRITERIA
+    
+    criteria = context.user_data['overall']['speaking_criteria']
+    criteria.append(score)
+    
+    if len(criteria) < len(OVERALL_SPEAKING_CRITERIA):
+        criterion, next_criterion = OVERALL_SPEAKING_CRITERIA[len(criteria) - 1:len(criteria) + 1]
+        update.message.reply_text(
+            i18n.render(locale, 'criterion_confirm', criterion=i18n.render(locale, f'criterion_{criterion}'), score=score)
+            + "\n\n" + i18n.render(locale, 'ask_criterion', criterion=i18n.render(locale, f'criterion_{next_criterion}')),
+            parse_mode="Markdown"
+        )
+        return OVERALL_S_CRITERIA
+    
+    add_overall_skill(context, 'speaking', get_score_tables(context).criteria_band(criteria))
+    return overall_result(update, context)
 
 def overall_speaking_score(update: Update, context: CallbackContext) -> int:
+    locale = user_locale(update, context)
     score, error = validate_band_score(update.message.text)
     if error:
-        update.message.reply_text(error)
+        update.message.reply_text(i18n.render(locale, error))
         return OVERALL_S_SCORE
     
-    context.user_data['overall']['speaking'] = score
+    add_overall_skill(context, 'speaking', score)
+    return overall_result(update, context)
+
+def overall_result(update: Update, context: CallbackContext) -> int:
+    """Send the overall band once all four skills are in, and end the conversation."""
+    locale = user_locale(update, context)
     
     # Calculate Overall IELTS score
     overall_data = context.user_data['overall']
@@ -892,95 +1109,350 @@ def overall_speaking_score(update: Update, context: CallbackContext) -> int:
     ]
     
     # Calculate average and round UP to nearest 0.5
-    average = sum(scores) / len(scores)
-    overall_score = round_up_to_half(average)
-    
-    result_message = f"📊 *IELTS Overall Band Score*\n\n"
-    result_message += f"Module: {overall_data['module']}\n\n"
-    result_message += f"🎧 *LISTENING*: {overall_data['listening']}\n"
-    result_message += f"📖 *READING*: {overall_data['reading']}\n"
-    result_message += f"✍️ *WRITING*: {overall_data['writing']}\n"
-    result_message += f"🗣️ *SPEAKING*: {overall_data['speaking']}\n\n"
-    result_message += f"*Overall Band Score:* {overall_score}"
+    overall_score = get_score_tables(context).overall_band(scores)
     
     update.message.reply_text(
-        result_message,
+        i18n.render(
+            locale, 'overall_result', module=module_label(locale, overall_data['module']),
+            listening=overall_data['listening'], reading=overall_data['reading'],
+            writing=overall_data['writing'], speaking=overall_data['speaking'], band=overall_score,
+        ),
         parse_mode="Markdown",
     )
+    record_result(
+        update, context, 'overall', overall_score, module=overall_data['module'],
+        listening=overall_data['listening'], reading=overall_data['reading'],
+        writing=overall_data['writing'], speaking=overall_data['speaking'],
+    )
     
     # End conversation with instruction to restart
     update.message.reply_text(
-        "If you want to calculate again, use the /start command.",
-        reply_markup=ReplyKeyboardRemove()
+        i18n.render(locale, 'calculate_again'),
+        reply_markup=remove_keyboard()
     )
     
-    return ConversationHandler.END
+    return END
 
 def cancel(update: Update, context: CallbackContext) -> int:
     update.message.reply_text(
-        "Operation cancelled. Send /start to begin again.",
-        reply_markup=ReplyKeyboardRemove()
+        i18n.render(user_locale(update, context), 'cancelled'),
+        reply_markup=remove_keyboard()
     )
-    return ConversationHandler.END
+    return END
 
 def help_command(update: Update, context: CallbackContext) -> None:
     """Send a message when the command /help is issued."""
     update.message.reply_text(
-        "*IELTS Score Calculator Bot Commands*\n\n"
-        "/start - Start a new IELTS score calculation\n"
-        "/clear - Clear conversation history\n"
-        "/help - Show this help message\n"
-        "/cancel - Cancel current calculation",
+        i18n.render(user_locale(update, context), 'help'),
         parse_mode="Markdown"
     )
 
-def main() -> None:
-    # Create the Updater
-    token = os.getenv('TOKEN')
-    if not token:
-        raise ValueError("No TOKEN found in environment variables")
-    updater = Updater(token)
+# LANGUAGE SECTION
+@lru_cache(maxsize=None)
+def language_keyboard():
+    """Inline keyboard with one button per available locale, in its own language."""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(i18n.render(locale, 'language_name'), callback_data=f"lang:{locale}")]
+        for locale in i18n.available_locales()
+    ])
+
+def language_command(update: Update, context: CallbackContext) -> None:
+    """Let the user pick the bot language."""
+    update.message.reply_text(
+        i18n.render(user_locale(update, context), 'language_prompt'),
+        reply_markup=language_keyboard()
+    )
+
+def language_choice(update: Update, context: CallbackContext) -> None:
+    """Save the language picked from the /language keyboard."""
+    query = update.callback_query
+    locale = query.data.partition(':')[2]
+    if locale in i18n.available_locales():
+        store = context.bot_data.get('languages')
+        if store is not None:
+            store.set(update.effective_user.id, locale)
+        context.bot_data.setdefault('locales', {})[update.effective_user.id] = locale
+    
+    query.answer()
+    query.edit_message_text(i18n.render(user_locale(update, context), 'language_set'))
+
+# HISTORY SECTION
+SKILL_KEYS = {
+    'listening': 'skill_listening',
+    'reading': 'skill_reading',
+    'writing': 'skill_writing',
+    'speaking': 'skill_speaking',
+    'overall': 'skill_overall',
+}
+
+def history_command(update: Update, context: CallbackContext) -> None:
+    """Show the user's last results (/history [N]) and how each skill is trending."""
+    locale = user_locale(update, context)
+    store = context.bot_data.get('history')
+    if store is None:
+        update.message.reply_text(i18n.render(locale, 'history_unavailable'))
+        return
+    
+    limit = 5
+    if context.args:
+        try:
+            limit = max(1, min(int(context.args[0]), 20))
+        except ValueError:
+            pass
+    
+    user_id = update.effective_user.id
+    rows = store.recent(user_id, limit)
+    if not rows:
+        update.message.reply_text(i18n.render(locale, 'history_empty'))
+        return
+    
+    result_message = i18n.render(locale, 'history_title', count=len(rows))
+    for created_at, skill, module, band in rows:
+        date = datetime.fromtimestamp(created_at, timezone.utc).strftime("%d.%m.%Y")
+        label = i18n.render(locale, SKILL_KEYS[skill])
+        if module:
+            result_message += i18n.render(
+                locale, 'history_row_module', date=date, skill=label, band=band, module=module_label(locale, module)
+            )
+        else:
+            result_message += i18n.render(locale, 'history_row', date=date, skill=label, band=band)
+    
+    # Trend per skill, from the oldest to the newest of its last results
+    trends = ""
+    for skill in SKILL_KEYS:
+        if skill not in {row[1] for row in rows}:
+            continue
+        bands = store.trend(user_id, skill, limit)
+        if len(bands) >= 2:
+            trends += i18n.render(
+                locale, 'history_trend_row', skill=i18n.render(locale, SKILL_KEYS[skill]),
+                first=bands[0], last=bands[-1], change=bands[-1] - bands[0],
+            )
+    if trends:
+        result_message += i18n.render(locale, 'history_trend_title') + trends
     
-    # Get the dispatcher
-    dispatcher = updater.dispatcher
+    update.message.reply_text(result_message, parse_mode="Markdown")
+
+# TARGET SECTION
+TARGET_KEYS = {'l': 'listening', 'r': 'reading', 'w': 'writing', 's': 'speaking'}
+
+def target_command(update: Update, context: CallbackContext) -> None:
+    """Answer "what do I need?" for an overall or Writing target band."""
+    locale = user_locale(update, context)
+    args = context.args or []
+    try:
+        if len(args) == 2 and args[0].lower() in ('writing', 'w'):
+            result_message = writing_target_message(locale, float(args[1]))
+        elif args:
+            known = {}
+            for arg in args[1:]:
+                key, _, value = arg.partition('=')
+                skill = TARGET_KEYS.get(key.strip().lower()[:1])
+                if skill is None or not value:
+                    raise ValueError(arg)
+                known[skill] = float(value)
+            result_message = overall_target_message(locale, float(args[0]), known)
+        else:
+            raise ValueError("no target")
+    except ValueError:
+        update.message.reply_text(i18n.render(locale, 'target_usage'))
+        return
     
-    # Add conversation handler
-    conv_handler = ConversationHandler(
+    update.message.reply_text(result_message, parse_mode="Markdown")
+
+def overall_target_message(locale, target, known):
+    result = target_solver.overall_target(target, known)
+    missing = ", ".join(i18n.render(locale, SKILL_KEYS[skill]) for skill in result.missing)
+    
+    result_message = i18n.render(locale, 'target_title', target=target)
+    for skill in target_solver.SKILLS:
+        if skill in known:
+            result_message += i18n.render(locale, 'target_known', skill=i18n.render(locale, SKILL_KEYS[skill]), band=known[skill])
+    result_message += "\n"
+    
+    if result.reached:
+        if missing:
+            result_message += i18n.render(locale, 'target_reached_any', target=target, skills=missing)
+        else:
+            result_message += i18n.render(locale, 'target_reached', target=target)
+    elif not missing:
+        result_message += i18n.render(locale, 'target_below', target=target)
+    elif result.uniform is None:
+        result_message += i18n.render(locale, 'target_out_of_reach', target=target, skills=missing)
+    else:
+        result_message += i18n.render(locale, 'target_needed', band=result.uniform, skills=missing)
+        if result.pairs:
+            result_message += i18n.render(locale, 'target_pairs_title', skills=missing)
+            result_message += "".join(i18n.render(locale, 'target_pair', first=a, second=b) for a, b in result.pairs)
+    return result_message
+
+def writing_target_message(locale, target):
+    combinations = target_solver.writing_target(target)
+    
+    result_message = i18n.render(locale, 'writing_target_title', target=target)
+    for combination in combinations:
+        result_message += i18n.render(locale, 'writing_target_row', t1=combination.task1, t2=combination.task2)
+    result_message += i18n.render(locale, 'writing_target_note')
+    return result_message
+
+def is_admin(update: Update) -> bool:
+    """Check the sender against the comma-separated ADMIN_IDS setting."""
+    admin_ids = os.getenv('ADMIN_IDS', '')
+    return str(update.effective_user.id) in [i.strip() for i in admin_ids.split(',') if i.strip()]
+
+def queue_stats_command(update: Update, context: CallbackContext) -> None:
+    """Show update queue depth and wait times per priority class (admins only)."""
+    if not is_admin(update):
+        return
+    
+    result_message = "⏱ *Update queue*\n"
+    for name, stats in context.dispatcher.update_queue.stats().items():
+        result_message += (
+            f"\n*{name}*: {stats['depth']} queued, {stats['served']} served, "
+            f"wait {stats['mean_wait_ms']:.1f}ms mean / {stats['max_wait_ms']:.1f}ms max"
+        )
+    
+    update.message.reply_text(result_message, parse_mode="Markdown")
+
+def health_command(update: Update, context: CallbackContext) -> None:
+    """Show memory, thread, queue and polling diagnostics (admins only)."""
+    if not is_admin(update):
+        return
+    
+    import health
+    
+    monitor = context.bot_data.get('health')
+    if monitor is None:
+        update.message.reply_text("Health monitoring is not enabled.")
+        return
+    
+    update.message.reply_text(health.summary(monitor.report()))
+
+def stats_command(update: Update, context: CallbackContext) -> None:
+    """Show band distributions per module and skill (/stats [today|YYYY-MM-DD], admins only)."""
+    if not is_admin(update):
+        return
+    
+    rollups = context.bot_data.get('analytics')
+    if rollups is None:
+        update.message.reply_text("Analytics are not enabled.")
+        return
+    
+    day = None
+    if context.args:
+        day = analytics.today() if context.args[0] == 'today' else context.args[0]
+    
+    histograms = rollups.histograms(day)
+    if not histograms:
+        update.message.reply_text(f"No results recorded for {day or 'any day'}.")
+        return
+    
+    result_message = f"📈 *Band distribution ({day or 'all time'})*\n"
+    for (module, skill), histogram in sorted(histograms.items()):
+        count, mean, median = analytics.describe(histogram)
+        result_message += f"\n*{module}* {i18n.render(i18n.DEFAULT_LOCALE, SKILL_KEYS[skill])}\n"
+        result_message += f"Results: {count}, mean: {mean:.2f}, median: {median}\n"
+        result_message += " ".join(f"{band}×{n}" for band, n in zip(analytics.BANDS, histogram) if n) + "\n"
+    
+    update.message.reply_text(result_message, parse_mode="Markdown")
+
+def reload_tables_command(update: Update, context: CallbackContext) -> None:
+    """Reload the conversion tables data file (admins only)."""
+    if not is_admin(update):
+        return
+    
+    try:
+        tables = score_tables.reload_tables()
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("Conversion table reload failed: %s", e)
+        update.message.reply_text(f"❌ Reload failed, keeping current tables.\n\n{e}")
+        return
+    
+    update.message.reply_text(f"✅ Conversion tables version {tables.version} active.")
+
+def broadcast_command(update: Update, context: CallbackContext) -> None:
+    """Send a message to every subscriber (/broadcast <text>), or show progress (admins only)."""
+    if not is_admin(update):
+        return
+    
+    import broadcast
+    
+    broadcaster = context.bot_data.get('broadcaster')
+    if broadcaster is None:
+        update.message.reply_text("Broadcasts are not enabled.")
+        return
+    
+    store = context.bot_data['subscribers']
+    reachable, blocked = store.count()
+    # Everything after the command, line breaks included
+    text = ''.join(update.message.text.split(None, 1)[1:]).strip()
+    if not text:
+        latest = store.latest_broadcast()
+        status = broadcast.summary(latest, reachable) if latest else "No broadcasts yet."
+        update.message.reply_text(
+            f"{status}\n\n{reachable} reachable chats, {blocked} blocked.\nUsage: /broadcast <message>"
+        )
+        return
+    
+    started = broadcaster.start(text, admin_chat_id=update.effective_chat.id)
+    if started is None:
+        update.message.reply_text(
+            "A broadcast is already running:\n\n" + broadcast.summary(store.latest_broadcast(), reachable)
+        )
+        return
+    
+    update.message.reply_text(
+        f"📣 Broadcast #{started.id} started to {reachable} chats. I'll report here when it's done."
+    )
+
+@lru_cache(maxsize=None)
+def build_conversation_handler():
+    """Build the conversation handler graph (once per process)."""
+    from telegram.ext import CommandHandler, ConversationHandler, Filters, MessageHandler
+    
+    text_filter = Filters.text & ~Filters.command
+    
+    return ConversationHandler(
         entry_points=[CommandHandler("start", start)],
         states={
-            MENU: [MessageHandler(Filters.text & ~Filters.command, menu_choice)],
+            MENU: [MessageHandler(text_filter, menu_choice)],
             
             # Listening states
-            LISTENING: [MessageHandler(Filters.text & ~Filters.command, listening_score)],
+            LISTENING: [MessageHandler(text_filter, listening_score)],
             
             # Reading states
-            READING_MODULE: [MessageHandler(Filters.text & ~Filters.command, reading_module)],
-            READING_SCORE: [MessageHandler(Filters.text & ~Filters.command, reading_score)],
+            READING_MODULE: [MessageHandler(text_filter, reading_module)],
+            READING_SCORE: [MessageHandler(text_filter, reading_score)],
             
             # Writing states
-            WRITING_T1_TA: [MessageHandler(Filters.text & ~Filters.command, writing_t1_ta)],
-            WRITING_T1_CC: [MessageHandler(Filters.text & ~Filters.command, writing_t1_cc)],
-            WRITING_T1_LR: [MessageHandler(Filters.text & ~Filters.command, writing_t1_lr)],
-            WRITING_T1_GRA: [MessageHandler(Filters.text & ~Filters.command, writing_t1_gra)],
-            WRITING_T2_TR: [MessageHandler(Filters.text & ~Filters.command, writing_t2_tr)],
-            WRITING_T2_CC: [MessageHandler(Filters.text & ~Filters.command, writing_t2_cc)],
-            WRITING_T2_LR: [MessageHandler(Filters.text & ~Filters.command, writing_t2_lr)],
-            WRITING_T2_GRA: [MessageHandler(Filters.text & ~Filters.command, writing_t2_gra)],
+            WRITING_T1_TA: [MessageHandler(text_filter, writing_t1_ta)],
+            WRITING_T1_CC: [MessageHandler(text_filter, writing_t1_cc)],
+            WRITING_T1_LR: [MessageHandler(text_filter, writing_t1_lr)],
+            WRITING_T1_GRA: [MessageHandler(text_filter, writing_t1_gra)],
+            WRITING_T2_TR: [MessageHandler(text_filter, writing_t2_tr)],
+            WRITING_T2_CC: [MessageHandler(text_filter, writing_t2_cc)],
+            WRITING_T2_LR: [MessageHandler(text_filter, writing_t2_lr)],
+            WRITING_T2_GRA: [MessageHandler(text_filter, writing_t2_gra)],
             
             # Speaking states
-            SPEAKING_FC: [MessageHandler(Filters.text & ~Filters.command, speaking_fc)],
-            SPEAKING_LR: [MessageHandler(Filters.text & ~Filters.command, speaking_lr)],
-            SPEAKING_GRA: [MessageHandler(Filters.text & ~Filters.command, speaking_gra)],
-            SPEAKING_PR: [MessageHandler(Filters.text & ~Filters.command, speaking_pr)],
+            SPEAKING_FC: [MessageHandler(text_filter, speaking_fc)],
+            SPEAKING_LR: [MessageHandler(text_filter, speaking_lr)],
+            SPEAKING_GRA: [MessageHandler(text_filter, speaking_gra)],
+            SPEAKING_PR: [MessageHandler(text_filter, speaking_pr)],
             
             # Overall states
-            OVERALL_MODULE: [MessageHandler(Filters.text & ~Filters.command, overall_module)],
-            OVERALL_L_TYPE: [MessageHandler(Filters.text & ~Filters.command, overall_listening_type)],
-            OVERALL_L_SCORE: [MessageHandler(Filters.text & ~Filters.command, overall_listening_score)],
-            OVERALL_R_TYPE: [MessageHandler(Filters.text & ~Filters.command, overall_reading_type)],
-            OVERALL_R_SCORE: [MessageHandler(Filters.text & ~Filters.command, overall_reading_score)],
-            OVERALL_W_SCORE: [MessageHandler(Filters.text & ~Filters.command, overall_writing_score)],
-            OVERALL_S_SCORE: [MessageHandler(Filters.text & ~Filters.command, overall_speaking_score)],
+            OVERALL_MODULE: [MessageHandler(text_filter, overall_module)],
+            OVERALL_L_TYPE: [MessageHandler(text_filter, overall_listening_type)],
+            OVERALL_L_SCORE: [MessageHandler(text_filter, overall_listening_score)],
+            OVERALL_R_TYPE: [MessageHandler(text_filter, overall_reading_type)],
+            OVERALL_R_SCORE: [MessageHandler(text_filter, overall_reading_score)],
+            OVERALL_W_TYPE: [MessageHandler(text_filter, overall_writing_type)],
+            OVERALL_W_CRITERIA: [MessageHandler(text_filter, overall_writing_criteria)],
+            OVERALL_W_SCORE: [MessageHandler(text_filter, overall_writing_score)],
+            OVERALL_S_TYPE: [MessageHandler(text_filter, overall_speaking_type)],
+            OVERALL_S_CRITERIA: [MessageHandler(text_filter, overall_speaking_criteria)],
+            OVERALL_S_SCORE: [MessageHandler(text_filter, overall_speaking_score)],
         },
         fallbacks=[
             CommandHandler("cancel", cancel),
@@ -988,15 +1460,154 @@ def main() -> None:
             CommandHandler("clear", clear),  # Add /clear as fallback so it works anywhere
         ],
     )
+
+def add_handlers(dispatcher) -> None:
+    """Register every update handler; shared by the bot and the replay tool."""
+    from telegram import Update
+    from telegram.ext import CallbackQueryHandler, CommandHandler, TypeHandler
+    
+    # Drop redelivered updates before any other handler sees them
+    dispatcher.add_handler(TypeHandler(Update, drop_duplicate_updates), group=-1)
     
-    dispatcher.add_handler(conv_handler)
+    # Add conversation handler
+    dispatcher.add_handler(build_conversation_handler())
     
     # Add standalone help command handler
     dispatcher.add_handler(CommandHandler("help", help_command))
+    dispatcher.add_handler(CommandHandler("history", history_command))
+    dispatcher.add_handler(CommandHandler("target", target_command))
+    dispatcher.add_handler(CommandHandler("language", language_command))
+    dispatcher.add_handler(CallbackQueryHandler(language_choice, pattern="^lang:"))
+    
+    # Admin commands
+    dispatcher.add_handler(CommandHandler("reload_tables", reload_tables_command))
+    dispatcher.add_handler(CommandHandler("stats", stats_command))
+    dispatcher.add_handler(CommandHandler("queue_stats", queue_stats_command))
+    dispatcher.add_handler(CommandHandler("health", health_command))
+    dispatcher.add_handler(CommandHandler("broadcast", broadcast_command))
+
+def main() -> None:
+    from dotenv import load_dotenv
+    from telegram import Bot, Update
+    from telegram.ext import TypeHandler, Updater
+    from telegram.utils.request import Request
+    
+    import broadcast
+    import graceful_shutdown
+    import health
+    
+    # Load environment variables
+    load_dotenv()
+    
+    # Enable logging
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+    )
+    
+    # Create the Updater
+    token = os.getenv('TOKEN')
+    if not token:
+        raise ValueError("No TOKEN found in environment variables")
+    # Bot API latency is tracked for the health report
+    request = health.TimedRequest(con_pool_size=8)
+    bot = graceful_shutdown.PollingBot(token, request=request)
+    updater = Updater(bot=bot)
+    
+    # Get the dispatcher
+    dispatcher = updater.dispatcher
+    
+    # Compile the message catalogs before the first update needs them
+    i18n.get_catalogs()
+    
+    # Languages chosen with /language, kept across restarts
+    language_choices = language_store.LanguageStore()
+    dispatcher.bot_data['languages'] = language_choices
+    
+    # Serve users mid-conversation before new sessions
+    updater.update_queue = dispatcher.update_queue = update_scheduler.PriorityUpdateQueue(
+        update_priority, max_wait=float(os.getenv('SCHEDULER_MAX_WAIT', '5'))
+    )
+    
+    # Result history, written in batches by a background thread
+    store = history_store.ResultStore()
+    dispatcher.bot_data['history'] = store
+    
+    # Analytics rollups, restored from and periodically saved to a snapshot
+    rollups = analytics.Rollups()
+    rollups.load()
+    rollups.snapshot_every(float(os.getenv('ANALYTICS_SNAPSHOT_INTERVAL', '60')))
+    dispatcher.bot_data['analytics'] = rollups
+    
+    # Drop redelivered updates before any other handler sees them
+    dispatcher.bot_data['dedup'] = update_dedup.UpdateDeduplicator(
+        window=float(os.getenv('DEDUP_WINDOW', '600'))
+    )
+    
+    # Record anonymized updates for replay_updates.py, if enabled
+    recorder = None
+    record_path = os.getenv('RECORD_UPDATES_PATH')
+    if record_path:
+        recorder = update_recorder.UpdateRecorder(record_path)
+        dispatcher.bot_data['recorder'] = recorder
+        dispatcher.add_handler(TypeHandler(Update, record_update), group=-2)
+        logger.info("Recording updates to %s", record_path)
+    
+    # Broadcast subscribers: every chat that writes to the bot, seeded with
+    # the users in the result history
+    subscriber_store = subscribers.SubscriberStore()
+    if not any(subscriber_store.count()):
+        subscriber_store.add_many(store.user_ids())
+    dispatcher.bot_data['subscribers'] = subscriber_store
+    dispatcher.add_handler(TypeHandler(Update, register_chat), group=1)
+    
+    # Broadcasts send through their own connection pool, so replies never wait on them
+    broadcast_workers = int(os.getenv('BROADCAST_WORKERS', '8'))
+    broadcaster = broadcast.Broadcaster(
+        Bot(token, request=Request(con_pool_size=broadcast_workers + 1)), subscriber_store, workers=broadcast_workers
+    )
+    dispatcher.bot_data['broadcaster'] = broadcaster
+    
+    # Resource and liveness diagnostics for /health and HEALTH_PORT
+    monitor = health.HealthMonitor(
+        dispatcher, request,
+        interval=float(os.getenv('HEALTH_INTERVAL', '10')),
+        max_poll_age=float(os.getenv('HEALTH_MAX_POLL_AGE', '60')),
+    )
+    monitor.start()
+    dispatcher.bot_data['health'] = monitor
+    health_port = os.getenv('HEALTH_PORT')
+    if health_port:
+        monitor.serve(int(health_port), os.getenv('HEALTH_HOST', '127.0.0.1'))
+    
+    add_handlers(dispatcher)
+    
+    # On a stop signal or when a new worker starts polling, finish the queued
+    # updates and save state before exiting
+    drainer = graceful_shutdown.Drainer(updater, deadline=float(os.getenv('DRAIN_TIMEOUT', '20')))
+    dispatcher.add_error_handler(drainer.handle_error)
+    drainer.on_drained(broadcaster.stop)
+    drainer.on_drained(rollups.snapshot)
+    drainer.on_drained(store.close)
+    if recorder is not None:
+        drainer.on_drained(recorder.close)
+    drainer.on_drained(subscriber_store.close)
+    drainer.on_drained(language_choices.close)
+    drainer.on_drained(monitor.stop)
     
     # Start the Bot
-    updater.start_polling()
-    updater.idle()
+    updater.start_polling(timeout=float(os.getenv('POLL_TIMEOUT', '5')))
+    
+    # Finish a broadcast interrupted by the last restart
+    broadcaster.resume()
+    
+    # Load the conversion tables after polling has started, and pick up edits
+    # to the conversion tables data file
+    threading.Thread(target=score_tables.get_tables, name="score-tables-warmup", daemon=True).start()
+    watch_interval = float(os.getenv('CONVERSION_TABLES_WATCH_INTERVAL', '30'))
+    if watch_interval > 0:
+        score_tables.watch_conversion_file(watch_interval)
+    
+    drainer.idle()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,52 @@
+"""Languages chosen with /language, stored in SQLite.
+
+Only explicit choices are stored; everyone else gets their Telegram
+language. The bot keeps the locale of every user it has seen in
+``bot_data['locales']``, so a user's row is read at most once per process,
+and a choice survives restarts and deploys.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "languages.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS languages (
+    user_id INTEGER PRIMARY KEY,
+    locale TEXT NOT NULL,
+    chosen_at REAL NOT NULL
+);
+"""
+
+
+class LanguageStore:
+    """SQLite store of each user's chosen locale."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("LANGUAGE_DB_PATH") or DEFAULT_PATH
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def get(self, user_id):
+        """Return the user's chosen locale, or None if they never chose one."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT locale FROM languages WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, user_id, locale):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO languages (user_id, locale, chosen_at) VALUES (?, ?, ?)",
+                (user_id, locale, time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,187 @@
+"""Replay a recorded update log through the bot's handlers.
+
+Feeds a log written by ``update_recorder`` (``RECORD_UPDATES_PATH``) through a
+dispatcher set up with the bot's own handlers, against a fake Bot API, and
+reports the time spent in each handler. Real traffic then becomes a
+repeatable benchmark:
+
+    python replay_updates.py updates.log [--speed 1] [--api-latency 0] [--max-gap 5]
+
+``--speed 1`` keeps the original pacing, ``--speed 10`` plays it ten times
+faster and ``--speed 0`` sends every update as soon as the last one is done.
+``--api-latency`` adds a delay (ms) to every fake Bot API call, since
+replies are sent from inside the handlers.
+"""
+import argparse
+import functools
+import logging
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict
+from queue import Queue
+
+import analytics
+import history_store
+import ielts_score_bot
+import update_dedup
+import update_recorder
+
+# Fake Bot API token; nothing is sent to Telegram
+TOKEN = "123456:replay"
+
+
+def fake_bot(api_latency=0.0):
+    """A Bot whose API calls are answered locally, with ``api_latency`` seconds each."""
+    from telegram import Bot
+    from telegram.utils.request import Request
+
+    class FakeRequest(Request):
+        calls = Counter()
+
+        def post(self, url, data, timeout=None):
+            method = url.rsplit("/", 1)[-1]
+            self.calls[method] += 1
+            if api_latency:
+                time.sleep(api_latency)
+            if method == "getMe":
+                return {"id": 1, "is_bot": True, "first_name": "IELTS bot", "username": "ielts_bot"}
+            if method in ("sendMessage", "editMessageText"):
+                return {
+                    "message_id": data.get("message_id", 1), "date": int(time.time()),
+                    "chat": {"id": data.get("chat_id", 1), "type": "private"}, "text": data.get("text", ""),
+                }
+            return True
+
+    request = FakeRequest(con_pool_size=2)
+    return Bot(TOKEN, request=request), request.calls
+
+
+def to_update(record, bot):
+    """Rebuild a telegram Update from a log record."""
+    from telegram import Update
+
+    user = {"id": record.user, "is_bot": False, "first_name": "user", "language_code": record.language}
+    chat = {"id": record.chat, "type": "private"}
+    message = {"message_id": record.message_id, "date": int(record.timestamp), "chat": chat}
+
+    if record.kind == update_recorder.MESSAGE:
+        message.update({"from": user, "text": record.text})
+        if record.text and record.text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(record.text.split()[0])}]
+        data = {"update_id": record.update_id, "message": message}
+    else:
+        query = {"id": str(record.update_id), "chat_instance": str(record.chat), "from": user, "data": record.text}
+        if record.message_id is not None:
+            query["message"] = dict(message, text="")
+        data = {"update_id": record.update_id, "callback_query": query}
+    return Update.de_json(data, bot)
+
+
+def time_handlers(dispatcher, timings):
+    """Wrap every handler callback so its run time is appended to ``timings[name]``."""
+    from telegram.ext import ConversationHandler
+
+    def timed(callback):
+        @functools.wraps(callback)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                timings[callback.__name__].append(time.perf_counter() - start)
+        return wrapper
+
+    handlers = []
+    for group in dispatcher.handlers.values():
+        for handler in group:
+            if isinstance(handler, ConversationHandler):
+                handlers += handler.entry_points + handler.fallbacks
+                handlers += [h for state in handler.states.values() for h in state]
+            else:
+                handlers.append(handler)
+    for handler in {id(h): h for h in handlers}.values():
+        handler.callback = timed(handler.callback)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))]
+
+
+def replay(records, bot, dispatcher, speed=1.0, max_gap=5.0):
+    """Process ``records`` in order; return the wall time of each update."""
+    totals = []
+    started = time.perf_counter()
+    offset = 0.0
+    previous = None
+    for record in records:
+        if previous is not None:
+            offset += min(record.timestamp - previous, max_gap)
+        previous = record.timestamp
+        if speed > 0:
+            delay = started + offset / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        update = to_update(record, bot)
+        start = time.perf_counter()
+        dispatcher.process_update(update)
+        totals.append(time.perf_counter() - start)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="update log written with RECORD_UPDATES_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="pacing factor, 0 for no pauses")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="ms per fake Bot API call")
+    parser.add_argument("--max-gap", type=float, default=5.0, help="longest pause kept between updates (s)")
+    args = parser.parse_args()
+
+    from telegram.ext import Dispatcher
+
+    logging.basicConfig(format="%(levelname)s - %(message)s", level=logging.WARNING)
+    records = list(update_recorder.read_log(args.log))
+    if not records:
+        parser.error(f"{args.log} has no recorded updates")
+
+    bot, api_calls = fake_bot(args.api_latency / 1000)
+    dispatcher = Dispatcher(bot, Queue(), workers=1)
+
+    errors = []
+    dispatcher.add_error_handler(lambda update, context: errors.append(context.error))
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The same services as the bot, with throwaway storage
+        store = history_store.ResultStore(os.path.join(directory, "history.sqlite3"))
+        dispatcher.bot_data['history'] = store
+        dispatcher.bot_data['analytics'] = analytics.Rollups(os.path.join(directory, "analytics.json"))
+        dispatcher.bot_data['dedup'] = update_dedup.UpdateDeduplicator()
+        ielts_score_bot.add_handlers(dispatcher)
+
+        timings = defaultdict(list)
+        time_handlers(dispatcher, timings)
+
+        started = time.perf_counter()
+        totals = replay(records, bot, dispatcher, args.speed, args.max_gap)
+        elapsed = time.perf_counter() - started
+        store.close()
+
+    print(f"{len(records)} updates in {elapsed:.2f}s ({len(records) / elapsed:.0f}/s), "
+          f"{sum(api_calls.values()) - api_calls['getMe']} API calls, {len(errors)} errors")
+
+    rows = [("(update)", totals)] + sorted(timings.items(), key=lambda item: -sum(item[1]))
+    print(f"\n{'handler':<26} {'calls':>6} {'total':>10} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}")
+    for name, values in rows:
+        print(f"{name:<26} {len(values):>6} {sum(values) * 1000:>8.1f}ms "
+              + " ".join(f"{v * 1000:>7.2f}ms" for v in (
+                  sum(values) / len(values), percentile(values, 0.5), percentile(values, 0.95), max(values),
+              )))
+
+    for error in errors[:5]:
+        print(f"\nerror: {error!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Active raw score conversion tables, reloadable without a restart.
+
+The raw score -> band conversions are compiled from the versioned conversion
+data file into 41-entry tuples (``scoring.load_conversion_tables``), so a
+conversion is a single index. They are small enough that every worker
+process simply holds its own copy.
+
+Criteria, Writing and overall bands are computed with the arithmetic in
+``scoring``: a few float operations are faster in Python than packing the
+inputs into a table offset (0.4us against 2.2us per criteria band).
+
+``reload_tables`` compiles the data file and swaps in new tables with a
+single reference assignment, so lookups never take a lock. Tables are
+compared by content, not only by version, so a data file edited without
+bumping ``version`` is still picked up (and logs an error).
+"""
+import logging
+import os
+import threading
+
+import scoring
+
+HALF_BANDS = 17  # 1.0, 1.5, ..., 9.0
+RAW_SCORES = 41  # 0 - 40
+BANDS = tuple(1.0 + index / 2 for index in range(HALF_BANDS))
+
+logger = logging.getLogger(__name__)
+
+
+def half_band_index(band):
+    """Return the 0 - 16 index of a half-band score, or None if off the grid."""
+    doubled = band * 2
+    if not 2 <= doubled <= 18 or doubled != int(doubled):
+        return None
+    return int(doubled) - 2
+
+
+class ScoreTables:
+    """Lookups over one compiled version of the conversion tables."""
+
+    def __init__(self, conversion):
+        self.conversion = conversion
+        self.version = conversion.version
+
+    def listening_band(self, raw_score):
+        return self.conversion.listening[raw_score]
+
+    def reading_band(self, module, raw_score):
+        bands = self.conversion.reading_academic if module == "Academic" else self.conversion.reading_general
+        return bands[raw_score]
+
+    # Plain arithmetic beats any table lookup for these
+    criteria_band = staticmethod(scoring.criteria_band)
+    writing_band = staticmethod(scoring.writing_band)
+    overall_band = staticmethod(scoring.overall_band)
+
+
+_active = None
+_reload_lock = threading.Lock()
+
+
+def get_tables():
+    """Return the active tables, loading them on first use.
+
+    Callers should fetch this once per calculation and read ``version`` from
+    the same object, so a concurrent reload cannot mix two versions.
+    """
+    tables = _active
+    if tables is None:
+        tables = reload_tables()
+    return tables
+
+
+def reload_tables(conversion_path=None):
+    """Load the conversion data file and swap in its tables if they changed.
+
+    Raises ``ValueError`` or ``OSError`` for a bad data file, leaving the current
+    tables active.
+    """
+    global _active
+    with _reload_lock:
+        conversion = scoring.load_conversion_tables(conversion_path)
+        if _active is None or _active.conversion != conversion:
+            if _active is not None and _active.version == conversion.version:
+                logger.error(
+                    "Conversion tables changed without a version bump (still %s); bump \"version\" in the "
+                    "data file so results can be told apart", conversion.version,
+                )
+            _active = ScoreTables(conversion)
+            logger.info("Conversion tables version %s active", conversion.version)
+        return _active
+
+
+def watch_conversion_file(interval=30, conversion_path=None):
+    """Reload the tables in a daemon thread whenever the data file changes."""
+    path = conversion_path or os.getenv("CONVERSION_TABLES_PATH") or scoring.DEFAULT_CONVERSION_PATH
+
+    def mtime():
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def run(last_seen):
+        while not stop.wait(interval):
+            current = mtime()
+            if current is None or current == last_seen:
+                continue
+            last_seen = current
+            try:
+                reload_tables(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.error("Keeping current conversion tables, %s is invalid: %s", path, e)
+
+    stop = threading.Event()
+    threading.Thread(target=run, args=(mtime(),), name="conversion-table-watcher", daemon=True).start()
+    return stop
@@ -0,0 +1,68 @@
+"""IELTS scoring rules.
+
+Plain reference implementations of every conversion and rounding rule the bot
+uses. Raw score conversion thresholds live in a versioned data file
+(``conversion_tables.json``) rather than in code. Nothing outside the standard
+library is imported, so this can be used to build the tables in
+``score_tables`` and to check them.
+"""
+import json
+import math
+import os
+from collections import namedtuple
+
+CONVERSIONS = ("listening", "reading_academic", "reading_general")
+DEFAULT_CONVERSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "conversion_tables.json")
+
+# Compiled raw score -> band tables (index = raw score 0 - 40), tagged with the
+# version of the data file they came from
+ConversionTables = namedtuple("ConversionTables", ("version",) + CONVERSIONS)
+
+
+def compile_thresholds(thresholds):
+    """Turn ``[[min_raw, band], ...]`` (highest first) into a 41-entry band tuple."""
+    bands = []
+    previous_min, previous_band = 41, 9.0
+    for min_raw, band in thresholds:
+        if not 0 <= min_raw < previous_min:
+            raise ValueError(f"Raw thresholds must be descending within 0 - 40, got {min_raw}")
+        if band * 2 != int(band * 2) or not 1.0 <= band <= previous_band:
+            raise ValueError(f"Bands must be descending half-band scores, got {band}")
+        bands.extend([float(band)] * (previous_min - min_raw))
+        previous_min, previous_band = min_raw, band
+    if previous_min != 0:
+        raise ValueError("Raw thresholds must go down to 0")
+    bands.reverse()
+    return tuple(bands)
+
+
+def load_conversion_tables(path=None):
+    """Load and compile a versioned conversion table data file."""
+    path = path or os.getenv("CONVERSION_TABLES_PATH") or DEFAULT_CONVERSION_PATH
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    version = str(data.get("version", "")).strip()
+    if not version:
+        raise ValueError(f"{path} has no version")
+    return ConversionTables(version, *(compile_thresholds(data[name]) for name in CONVERSIONS))
+
+
+# Round down to nearest 0.5 (IELTS criteria rounding)
+def round_down_to_half(value):
+    return math.floor(value * 2) / 2
+
+# Round up to nearest 0.5 (IELTS overall rounding)
+def round_up_to_half(value):
+    return math.ceil(value * 2) / 2
+
+# Writing task / Speaking score from its four criteria (rounded DOWN)
+def criteria_band(scores):
+    return round_down_to_half(sum(scores) / len(scores))
+
+# Overall Writing score (Task 1 is 1/3, Task 2 is 2/3, rounded UP)
+def writing_band(t1_score, t2_score):
+    return round_up_to_half((t1_score * 1/3) + (t2_score * 2/3))
+
+# Overall IELTS score from the four skills (rounded UP)
+def overall_band(scores):
+    return round_up_to_half(sum(scores) / len(scores))
@@ -0,0 +1,83 @@
+"""Startup time benchmark for the bot worker.
+
+Times each startup stage in fresh interpreters and prints a ``-X importtime``
+breakdown of the slowest imports, so cold start regressions show up before a
+deploy:
+
+    python startup_bench.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Stage name -> statement timed in a fresh interpreter
+STAGES = {
+    "scoring core": "import scoring, score_tables",
+    "bot module": "import ielts_score_bot",
+    "bot + telegram": "import ielts_score_bot, telegram.ext",
+    "handler graph": "import ielts_score_bot; ielts_score_bot.build_conversation_handler()",
+}
+
+TIMER = "import time; t = time.perf_counter(); {stmt}; print(time.perf_counter() - t)"
+
+
+def run_stage(stmt, runs):
+    """Return wall-clock seconds for ``stmt`` in ``runs`` fresh interpreters."""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMER.format(stmt=stmt)],
+            cwd=HERE, check=True, capture_output=True, text=True,
+        ).stdout
+        timings.append(float(output.split()[-1]))
+    return timings
+
+
+def import_profile(stmt):
+    """Return ``(self_us, cumulative_us, depth, module)`` rows from ``-X importtime``."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", stmt],
+        cwd=HERE, check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="interpreters per stage")
+    parser.add_argument("--top", type=int, default=15, help="imports to list")
+    args = parser.parse_args()
+
+    print(f"{'stage':<16} {'median':>10} {'min':>10} {'max':>10}")
+    for name, stmt in STAGES.items():
+        timings = run_stage(stmt, args.runs)
+        print(f"{name:<16} {statistics.median(timings) * 1000:>8.1f}ms "
+              f"{min(timings) * 1000:>8.1f}ms {max(timings) * 1000:>8.1f}ms")
+
+    rows = import_profile(STAGES["handler graph"])
+    top_level = [row for row in rows if row[2] == 0]
+    total_us = sum(row[1] for row in top_level)
+    print(f"\nimporttime total: {total_us / 1000:.1f}ms over {len(rows)} modules")
+
+    print("\nslowest top-level imports (cumulative):")
+    for self_us, cumulative_us, _, name in sorted(top_level, reverse=True, key=lambda row: row[1])[:args.top]:
+        print(f"  {cumulative_us / 1000:>8.1f}ms  {name}")
+
+    print("\nslowest modules (self):")
+    for self_us, cumulative_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:>8.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
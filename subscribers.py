@@ -0,0 +1,147 @@
+"""Registry of chats that have used the bot, and broadcast checkpoints.
+
+Every incoming update calls ``SubscriberStore.add``. Known chat ids are held
+in a set, so only a chat's first update (or its first update after being
+marked blocked) touches the database. Broadcasts walk the table in chat id
+order and store their cursor and counters after every batch, so a restarted
+worker resumes where the last one stopped.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "subscribers.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    chat_id INTEGER PRIMARY KEY,
+    first_seen REAL NOT NULL,
+    blocked_at REAL
+);
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    parse_mode TEXT,
+    admin_chat_id INTEGER,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    cursor INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+Broadcast = namedtuple(
+    "Broadcast",
+    "id text parse_mode admin_chat_id created_at finished_at cursor sent blocked failed retries",
+)
+
+# Smaller than every chat id, including negative group ids
+START_CURSOR = -(2 ** 63)
+
+
+class SubscriberStore:
+    """SQLite subscriber registry with an in-memory index of known chats."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("SUBSCRIBERS_DB_PATH") or DEFAULT_PATH
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._active = set()
+        self._blocked = set()
+        for chat_id, blocked_at in self._connection.execute("SELECT chat_id, blocked_at FROM subscribers"):
+            (self._active if blocked_at is None else self._blocked).add(chat_id)
+
+    def add(self, chat_id):
+        """Register a chat the bot has heard from; cheap for known chats."""
+        if chat_id in self._active:
+            return
+        with self._lock, self._connection:
+            if chat_id in self._blocked:
+                self._connection.execute("UPDATE subscribers SET blocked_at = NULL WHERE chat_id = ?", (chat_id,))
+                self._blocked.discard(chat_id)
+            else:
+                self._connection.execute(
+                    "INSERT OR IGNORE INTO subscribers (chat_id, first_seen) VALUES (?, ?)", (chat_id, time.time())
+                )
+            self._active.add(chat_id)
+
+    def add_many(self, chat_ids):
+        """Register chats in bulk, e.g. users from the result history; return how many were new."""
+        new = {chat_id for chat_id in chat_ids if chat_id not in self._active and chat_id not in self._blocked}
+        if new:
+            with self._lock, self._connection:
+                now = time.time()
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO subscribers (chat_id, first_seen) VALUES (?, ?)",
+                    [(chat_id, now) for chat_id in new],
+                )
+                self._active.update(new)
+        return len(new)
+
+    def count(self):
+        """Return ``(active, blocked)`` chat counts."""
+        return len(self._active), len(self._blocked)
+
+    def chats_after(self, cursor, limit):
+        """Next ``limit`` reachable chat ids above ``cursor``, ascending."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT chat_id FROM subscribers WHERE chat_id > ? AND blocked_at IS NULL "
+                "ORDER BY chat_id LIMIT ?",
+                (cursor, limit),
+            ).fetchall()
+        return [chat_id for chat_id, in rows]
+
+    # Broadcasts
+
+    def create_broadcast(self, text, parse_mode=None, admin_chat_id=None):
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO broadcasts (text, parse_mode, admin_chat_id, created_at, cursor) VALUES (?, ?, ?, ?, ?)",
+                (text, parse_mode, admin_chat_id, time.time(), START_CURSOR),
+            )
+        return self.broadcast(cursor.lastrowid)
+
+    def broadcast(self, broadcast_id):
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(Broadcast._fields)} FROM broadcasts WHERE id = ?", (broadcast_id,)
+            ).fetchone()
+        return Broadcast(*row) if row else None
+
+    def latest_broadcast(self, unfinished=False):
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(Broadcast._fields)} FROM broadcasts "
+                f"{'WHERE finished_at IS NULL ' if unfinished else ''}ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        return Broadcast(*row) if row else None
+
+    def checkpoint(self, broadcast_id, cursor, sent, blocked, failed, retries, blocked_chats=(), finished=False):
+        """Store broadcast progress and mark unreachable chats, in one transaction."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE broadcasts SET cursor = ?, sent = sent + ?, blocked = blocked + ?, failed = failed + ?, "
+                "retries = retries + ?, finished_at = ? WHERE id = ?",
+                (cursor, sent, blocked, failed, retries, now if finished else None, broadcast_id),
+            )
+            self._connection.executemany(
+                "UPDATE subscribers SET blocked_at = ? WHERE chat_id = ?",
+                [(now, chat_id) for chat_id in blocked_chats],
+            )
+            for chat_id in blocked_chats:
+                self._active.discard(chat_id)
+                self._blocked.add(chat_id)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
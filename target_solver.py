@@ -0,0 +1,104 @@
+"""Answers to "what do I need to reach band X?".
+
+The inverse tables are built once from the reference rules in ``scoring``.
+They stay tiny because of how the bands are combined:
+
+* The overall band depends only on the sum of the half-band indices of the
+  four skills (0 - 64). For each result band we store the smallest index
+  sum that reaches it.
+* Writing depends on the (Task 1, Task 2) pair. For each Writing band we store
+  the Pareto frontier of minimal pairs that reach it.
+
+A query is then a subtraction and a few table reads, with no search.
+"""
+from collections import namedtuple
+
+import scoring
+from score_tables import BANDS, HALF_BANDS, half_band_index
+
+SKILLS = ("listening", "reading", "writing", "speaking")
+MAX_SUM = 4 * (HALF_BANDS - 1)
+
+# ``reached``: the target is met whatever the missing skills score.
+# ``uniform``: lowest band needed in every missing skill (None if out of reach).
+# ``pairs``: minimal band pairs for exactly two missing skills.
+OverallTarget = namedtuple("OverallTarget", "missing reached uniform pairs")
+
+# Minimal (Task 1, Task 2) bands for a Writing target
+WritingCombination = namedtuple("WritingCombination", "task1 task2")
+
+
+def spread(total, width=4):
+    """Split an index sum as evenly as possible over ``width`` scores, ascending."""
+    base, extra = divmod(total, width)
+    return [base] * (width - extra) + [base + 1] * extra
+
+
+def _min_sums(combine):
+    """For each result index, the smallest input index sum that reaches it."""
+    results = [
+        half_band_index(combine([BANDS[i] for i in spread(total)]))
+        for total in range(MAX_SUM + 1)
+    ]
+    return tuple(
+        next((total for total, result in enumerate(results) if result >= target), None)
+        for target in range(HALF_BANDS)
+    )
+
+
+def _writing_frontier():
+    """For each Writing index, the minimal (Task 1, Task 2) index pairs that reach it."""
+    writing = [
+        [half_band_index(scoring.writing_band(BANDS[t1], BANDS[t2])) for t2 in range(HALF_BANDS)]
+        for t1 in range(HALF_BANDS)
+    ]
+    frontiers = []
+    for target in range(HALF_BANDS):
+        pairs = []
+        for t1 in range(HALF_BANDS):
+            t2 = next((t2 for t2 in range(HALF_BANDS) if writing[t1][t2] >= target), None)
+            if t2 is not None and (not pairs or t2 < pairs[-1][1]):
+                pairs.append((t1, t2))
+        frontiers.append(tuple(pairs))
+    return tuple(frontiers)
+
+
+OVERALL_MIN_SUM = _min_sums(scoring.overall_band)
+WRITING_FRONTIER = _writing_frontier()
+
+
+def _index(band):
+    index = half_band_index(band)
+    if index is None:
+        raise ValueError(f"{band} is not a band score between 1.0 and 9.0 in steps of 0.5")
+    return index
+
+
+def overall_target(target, known):
+    """Find what the missing skills need for an overall ``target``.
+
+    ``known`` maps skill names from ``SKILLS`` to half-band scores.
+    """
+    needed = OVERALL_MIN_SUM[_index(target)] - sum(_index(band) for band in known.values())
+    missing = [skill for skill in SKILLS if skill not in known]
+
+    if needed <= 0:
+        return OverallTarget(missing, True, BANDS[0] if missing else None, ())
+    if not missing or needed > len(missing) * (HALF_BANDS - 1):
+        return OverallTarget(missing, False, None, ())
+
+    uniform = BANDS[-(-needed // len(missing))]
+    pairs = ()
+    if len(missing) == 2:
+        low = max(0, needed - (HALF_BANDS - 1))
+        high = min(HALF_BANDS - 1, needed)
+        pairs = tuple((BANDS[a], BANDS[needed - a]) for a in range(low, high + 1))
+    return OverallTarget(missing, False, uniform, pairs)
+
+
+def writing_target(target):
+    """List the minimal Task 1 / Task 2 combinations that reach a Writing ``target``."""
+    return [
+        WritingCombination(BANDS[t1], BANDS[t2])
+        for t1, t2 in WRITING_FRONTIER[_index(target)]
+    ]
@@ -0,0 +1,86 @@
+"""Scheduling order of queued updates and duplicate detection in group chats."""
+import itertools
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update  # noqa: E402
+from telegram.ext import DispatcherHandlerStop  # noqa: E402
+
+import ielts_score_bot  # noqa: E402
+import update_dedup  # noqa: E402
+import update_scheduler  # noqa: E402
+
+GROUP = -100
+
+
+def group_message(update_id, message_id, user_id, text):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": message_id, "date": 0, "text": text,
+            "chat": {"id": GROUP, "type": "group", "title": "IELTS"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user {user_id}"},
+        },
+    }, None)
+
+
+class GroupChatOrderingTest(unittest.TestCase):
+    def setUp(self):
+        self.conversations = ielts_score_bot.build_conversation_handler().conversations
+        self.conversations[GROUP, 2] = ielts_score_bot.SPEAKING_FC
+
+    def tearDown(self):
+        self.conversations.pop((GROUP, 2), None)
+
+    def test_reordered_group_messages_are_not_duplicates(self):
+        queue = update_scheduler.PriorityUpdateQueue(ielts_score_bot.update_priority)
+        queue.put(group_message(1, 10, 1, "/start"))
+        queue.put(group_message(2, 11, 2, "7"))
+
+        # User 2 is mid-conversation, so their later message runs first
+        order = [queue.get_nowait() for _ in range(2)]
+        self.assertEqual([update.message.message_id for update in order], [11, 10])
+
+        dedup = update_dedup.UpdateDeduplicator()
+        context = SimpleNamespace(bot_data={'dedup': dedup})
+        for update in order:
+            ielts_score_bot.drop_duplicate_updates(update, context)
+        self.assertEqual(dedup.duplicates, 0)
+
+    def test_replayed_group_message_is_dropped(self):
+        dedup = update_dedup.UpdateDeduplicator()
+        context = SimpleNamespace(bot_data={'dedup': dedup})
+        ielts_score_bot.drop_duplicate_updates(group_message(1, 10, 1, "/start"), context)
+        with self.assertRaises(DispatcherHandlerStop):
+            ielts_score_bot.drop_duplicate_updates(group_message(2, 10, 1, "/start"), context)
+
+
+class StarvationTest(unittest.TestCase):
+    def test_overdue_new_update_beats_a_stream_of_final_updates(self):
+        queue = update_scheduler.PriorityUpdateQueue(lambda item: item, max_wait=5)
+        # Every reading of the fake clock is a second later, so the backlog is overdue
+        with mock.patch("update_scheduler.time.monotonic", side_effect=itertools.count().__next__):
+            queue.put(("new", update_scheduler.NEW))
+            for i in range(10):
+                queue.put((f"final {i}", update_scheduler.FINAL))
+            served = []
+            for i in range(10, 30):
+                queue.put((f"final {i}", update_scheduler.FINAL))
+                served.append(queue.get_nowait()[0])
+        self.assertEqual(served[0], "new")
+
+    def test_lanes_of_a_class_are_served_oldest_first(self):
+        queue = update_scheduler.PriorityUpdateQueue(lambda item: item[:2])
+        queue.put(("a", update_scheduler.CONVERSATION, 1))
+        queue.put(("a", update_scheduler.CONVERSATION, 2))
+        queue.put(("b", update_scheduler.CONVERSATION, 3))
+        self.assertEqual([queue.get_nowait()[2] for _ in range(3)], [1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Drop updates Telegram delivers more than once.
+
+Polling retries, restarts and webhook redelivery can hand the bot the same
+update twice, and each copy would advance a conversation one state further.
+``UpdateDeduplicator`` keeps recently seen update ids in a ring buffer plus a
+set (bounded in size and age), and the newest message id per chat and sender,
+so both a repeated update and a replayed message are recognised in O(1).
+
+The message id check relies on each sender's messages in a chat being
+handled in the order they arrived. ``PriorityUpdateQueue`` guarantees that
+per ``(chat, user)`` lane, but may run one user's message in a group chat
+before an older message from another user, so the watermark is kept per
+``(chat, user)`` rather than per chat.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class UpdateDeduplicator:
+    """Bounded, time-windowed index of handled updates."""
+
+    def __init__(self, max_updates=10000, window=600, max_chats=100000):
+        self.max_updates = max_updates
+        self.window = window
+        self.max_chats = max_chats
+        self._order = deque()  # (seen_at, update_id), oldest first
+        self._seen = set()
+        self._last_message = OrderedDict()  # (chat_id, user_id) -> newest message_id, LRU order
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def is_duplicate(self, update_id, chat_id=None, message_id=None, user_id=None, now=None):
+        """Return True if this update was already handled, otherwise remember it.
+
+        ``chat_id``, ``message_id`` and ``user_id`` should be given for new
+        messages: message ids only grow within a chat, so an old one from the
+        same sender means a replayed message even if it arrives under a new
+        update id.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+
+            duplicate = update_id in self._seen
+            if not duplicate and message_id is not None:
+                last = self._last_message.get((chat_id, user_id))
+                duplicate = last is not None and message_id <= last
+            if duplicate:
+                self.duplicates += 1
+                return True
+
+            self._order.append((now, update_id))
+            self._seen.add(update_id)
+            if message_id is not None:
+                self._last_message[chat_id, user_id] = message_id
+                self._last_message.move_to_end((chat_id, user_id))
+                if len(self._last_message) > self.max_chats:
+                    self._last_message.popitem(last=False)
+            return False
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        while self._order and (len(self._order) >= self.max_updates or self._order[0][0] < cutoff):
+            _, update_id = self._order.popleft()
+            self._seen.discard(update_id)
+
+    def __len__(self):
+        return len(self._order)
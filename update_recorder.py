@@ -0,0 +1,133 @@
+"""Opt-in recording of incoming updates for replay.
+
+``UpdateRecorder`` appends one compact JSON line per message or callback query:
+
+    [timestamp, update_id, kind, user, chat, message_id, language_code, text]
+
+``kind`` is ``"m"`` for a message (``text`` is its text) or ``"c"`` for a
+callback query (``text`` is its data, set by the bot's own keyboards). The
+log keeps only what the handlers act on, anonymized:
+
+* user and chat ids are replaced by keyed hashes. The key is random per
+  process unless ``salt`` is given, so ids cannot be linked back to accounts
+  or across recordings;
+* names, usernames and every other field are dropped;
+* message text is kept only if it is a button label, or made of commands, a
+  few command keywords, at most two numbers and ``key=band`` pairs. Numbers
+  must be in the shapes the handlers accept: a 0 - 40 raw score or a band
+  up to 9 with one or two decimals, so phone numbers, dates and codes do
+  not pass. Anything else is stored as ``"?"``, which the handlers treat
+  like any other unexpected text.
+
+``read_log`` turns a log back into ``Record`` tuples for ``replay_updates.py``.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+import i18n
+
+MESSAGE, CALLBACK_QUERY = "m", "c"
+REDACTED = "?"
+
+Record = namedtuple("Record", "timestamp update_id kind user chat message_id language text")
+
+# Commands (/target, /start@ielts_bot) and the keywords commands take
+COMMAND = re.compile(r"/\w+(@\w+)?")
+SAFE_WORDS = {"writing", "w", "today"}
+
+# Numbers the handlers accept: raw scores and bands, alone or as key=band
+RAW_SCORE = re.compile(r"\d{1,2}")
+BAND = re.compile(r"\d(\.\d{1,2})?")
+KEY_BAND = re.compile(r"[A-Za-z]{1,10}=(\d(\.\d{1,2})?)")
+MAX_NUMBERS = 2
+
+
+def _is_raw_score(token):
+    return RAW_SCORE.fullmatch(token) is not None and int(token) <= 40
+
+
+def _is_band(token):
+    return BAND.fullmatch(token) is not None and float(token) <= 9
+
+
+def sanitize(text):
+    """Return ``text`` if it cannot identify anyone, else ``REDACTED``."""
+    if text is None:
+        return None
+    if i18n.button_key(text):
+        return text
+    tokens = text.split()
+    if len(tokens) > 8:
+        return REDACTED
+    numbers = 0
+    for token in tokens:
+        if COMMAND.fullmatch(token) or token.lower() in SAFE_WORDS:
+            continue
+        if _is_raw_score(token) or _is_band(token):
+            numbers += 1
+            continue
+        key_band = KEY_BAND.fullmatch(token)
+        if key_band is None or not _is_band(key_band.group(1)):
+            return REDACTED
+    return text if numbers <= MAX_NUMBERS else REDACTED
+
+
+class UpdateRecorder:
+    """Append-only, anonymized log of incoming updates."""
+
+    def __init__(self, path, salt=None):
+        self.path = path
+        self._salt = salt or os.urandom(16)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self.recorded = 0
+
+    def pseudonym(self, id_):
+        """Stable anonymous id for a user or chat id, for this recorder's key."""
+        digest = hashlib.blake2b(str(id_).encode(), key=self._salt, digest_size=6).digest()
+        return int.from_bytes(digest, "big")
+
+    def record(self, update, now=None):
+        """Log a message or callback query update; other updates are ignored."""
+        if update.message is not None:
+            kind, message, text = MESSAGE, update.message, sanitize(update.message.text)
+        elif update.callback_query is not None:
+            # Callback data comes from the bot's own inline keyboards
+            kind, message, text = CALLBACK_QUERY, update.callback_query.message, update.callback_query.data
+        else:
+            return
+
+        user = update.effective_user
+        chat = update.effective_chat
+        row = [
+            round(time.time() if now is None else now, 3),
+            update.update_id,
+            kind,
+            self.pseudonym(user.id) if user else None,
+            self.pseudonym(chat.id) if chat else None,
+            message.message_id if message else None,
+            user.language_code if user else None,
+            text,
+        ]
+        line = json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_log(path):
+    """Yield the ``Record`` tuples of a recorded log, in order."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield Record(*json.loads(line))
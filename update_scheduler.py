@@ -0,0 +1,124 @@
+"""Priority scheduling of incoming updates.
+
+The dispatcher handles one update at a time from its update queue. With a
+plain FIFO, a burst of new users sending /start delays users who are deep in
+a calculation. ``PriorityUpdateQueue`` replaces that queue: each update gets a
+priority class, and the queue serves the most urgent class first.
+
+Updates are kept in per-user lanes, so a user's updates still run in the
+order they arrived. A lane is scheduled by the class of its oldest update,
+and lanes of a class are served oldest first. Once the oldest update in the
+queue has waited longer than ``max_wait``, its lane is served first whatever
+its class, so under sustained load the queue falls back to arrival order and
+new sessions are delayed but never starved.
+"""
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+# Priority classes, most urgent first
+FINAL, CONVERSATION, NEW = range(3)
+CLASS_NAMES = ("final", "conversation", "new")
+
+
+class PriorityUpdateQueue(queue.Queue):
+    """Drop-in replacement for the dispatcher's update queue.
+
+    ``classify(item)`` returns ``(lane_key, priority_class)`` for each queued
+    item. Items with the same lane key are served in FIFO order.
+    """
+
+    def __init__(self, classify, max_wait=5.0):
+        self.classify = classify
+        self.max_wait = max_wait
+        self._stats_lock = threading.Lock()
+        self._waits = [[0, 0.0, 0.0] for _ in CLASS_NAMES]  # count, total, max (seconds)
+        self._busy = 0.0  # seconds between handing out updates and their task_done()
+        self._busy_since = None
+        super().__init__()
+
+    # queue.Queue storage hooks, called with the queue's mutex held
+
+    def _init(self, maxsize):
+        self._lanes = {}  # lane key -> deque of (enqueued_at, class, item)
+        self._ready = [[] for _ in CLASS_NAMES]  # heaps of (enqueued_at, seq, lane key) by class of the head
+        self._depth = [0] * len(CLASS_NAMES)
+        self._seq = itertools.count()  # tie-break, lane keys need not be comparable
+
+    def _qsize(self):
+        return sum(self._depth)
+
+    def _put(self, item):
+        key, priority = self.classify(item)
+        now = time.monotonic()
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = deque()
+            heapq.heappush(self._ready[priority], (now, next(self._seq), key))
+        lane.append((now, priority, item))
+        self._depth[priority] += 1
+
+    def _get(self):
+        now = time.monotonic()
+        ready = [heap for heap in self._ready if heap]
+        oldest = min(ready, key=lambda heap: heap[0][0])
+        heap = oldest if now - oldest[0][0] >= self.max_wait else ready[0]
+
+        _, _, key = heapq.heappop(heap)
+        lane = self._lanes[key]
+        enqueued_at, priority, item = lane.popleft()
+        if lane:
+            head_at, head_priority, _ = lane[0]
+            heapq.heappush(self._ready[head_priority], (head_at, next(self._seq), key))
+        else:
+            del self._lanes[key]
+        self._depth[priority] -= 1
+        self._record_wait(priority, now - enqueued_at)
+        self._busy_since = now
+        return item
+
+    def task_done(self):
+        with self._stats_lock:
+            if self._busy_since is not None:
+                self._busy += time.monotonic() - self._busy_since
+                self._busy_since = None
+        super().task_done()
+
+    # Wait time export
+
+    def _record_wait(self, priority, wait):
+        with self._stats_lock:
+            waits = self._waits[priority]
+            waits[0] += 1
+            waits[1] += wait
+            waits[2] = max(waits[2], wait)
+
+    def stats(self):
+        """Return queue depth and wait times (ms) per priority class."""
+        with self.mutex:
+            depth = list(self._depth)
+        with self._stats_lock:
+            waits = [list(w) for w in self._waits]
+        return {
+            name: {
+                "depth": depth[priority],
+                "served": count,
+                "mean_wait_ms": total / count * 1000 if count else 0.0,
+                "max_wait_ms": longest * 1000,
+            }
+            for priority, (name, (count, total, longest)) in enumerate(zip(CLASS_NAMES, waits))
+        }
+
+    def busy_time(self):
+        """Seconds spent handling updates so far, the current one included.
+
+        The dispatcher takes one update at a time and calls ``task_done`` when
+        it is handled, so the growth of this value over an interval is how
+        busy the dispatcher thread was.
+        """
+        with self._stats_lock:
+            busy, since = self._busy, self._busy_since
+        return busy + (time.monotonic() - since if since is not None else 0.0)
@@ -0,0 +1,253 @@
+"""Exhaustive verification and benchmark of every scoring path.
+
+Every calculator has a small, finite input space: 41 raw scores per
+conversion, and 17 half-band scores per criterion or skill. This script
+enumerates all of it, in parallel across cores, for each scoring engine:
+
+* raw score conversions (Listening, Reading Academic, Reading General) are
+  compared with a step lookup over the thresholds in the conversion data
+  file. Results must be monotonic in the raw score;
+* Writing task / Speaking criteria (17^4), Writing Task 1/Task 2 (17^2) and
+  overall (17^4) are compared with exact rational versions of the rounding
+  rules. Results must be on the half-band grid and within half a band of
+  the mean, on the correct side. They must be monotonic in every input,
+  must not depend on input order (criteria, overall), and raising Task 2
+  must never score lower than raising Task 1 by the same amount.
+
+``scoring`` (the reference arithmetic) and the bot's active ``score_tables``
+are checked by default. Any other engine with the ``ScoreTables`` lookup methods
+can be proven equivalent before it is deployed:
+
+    python verify_scoring.py [--engine package.module:factory] [--workers N]
+
+Exits with status 1 if any check fails.
+"""
+import argparse
+import importlib
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from fractions import Fraction
+from multiprocessing import Pool
+
+import scoring
+import score_tables
+from score_tables import BANDS, HALF_BANDS, RAW_SCORES
+
+HALF = Fraction(1, 2)
+CONVERSION_CHECKS = ("listening", "reading_academic", "reading_general")
+
+# Failures reported per check and engine
+MAX_FAILURES = 5
+
+
+class ScoringEngine:
+    """The reference functions in ``scoring``, behind the ``ScoreTables`` interface."""
+
+    def __init__(self, conversion):
+        self.conversion = conversion
+
+    def listening_band(self, raw_score):
+        return self.conversion.listening[raw_score]
+
+    def reading_band(self, module, raw_score):
+        bands = self.conversion.reading_academic if module == "Academic" else self.conversion.reading_general
+        return bands[raw_score]
+
+    criteria_band = staticmethod(scoring.criteria_band)
+    writing_band = staticmethod(scoring.writing_band)
+    overall_band = staticmethod(scoring.overall_band)
+
+
+def load_engine(spec):
+    """Create an engine from ``"scoring"``, ``"tables"`` or ``"module:factory"``."""
+    if spec == "scoring":
+        return ScoringEngine(scoring.load_conversion_tables())
+    if spec == "tables":
+        return score_tables.get_tables()
+    module, _, factory = spec.partition(":")
+    return getattr(importlib.import_module(module), factory or "create_engine")()
+
+
+# Exact references, straight from the published rules
+
+def floor_half(value):
+    return Fraction(math.floor(value * 2), 2)
+
+
+def ceil_half(value):
+    return Fraction(math.ceil(value * 2), 2)
+
+
+def reference_conversion(thresholds, raw_score):
+    """Band of the first threshold (highest first) that ``raw_score`` reaches."""
+    return next(Fraction(band) for min_raw, band in thresholds if raw_score >= min_raw)
+
+
+def reference_writing(t1, t2):
+    return ceil_half(Fraction(t1) / 3 + Fraction(t2) * 2 / 3)
+
+
+# Checks; each returns (lookups, failures)
+
+def check_conversion(engine, name, thresholds):
+    if name == "listening":
+        lookup = engine.listening_band
+    else:
+        module = "Academic" if name == "reading_academic" else "General Training"
+
+        def lookup(raw_score):
+            return engine.reading_band(module, raw_score)
+
+    failures = []
+    results = [lookup(raw) for raw in range(RAW_SCORES)]
+    for raw, band in enumerate(results):
+        expected = reference_conversion(thresholds, raw)
+        if band != expected:
+            failures.append(f"raw {raw}: got {band}, expected {float(expected)}")
+        if raw and band < results[raw - 1]:
+            failures.append(f"not monotonic: raw {raw - 1} -> {results[raw - 1]}, raw {raw} -> {band}")
+    return RAW_SCORES, failures
+
+
+def check_four(engine, name, head):
+    """Criteria or overall results for every 4-score combination starting with ``head``."""
+    combine = engine.criteria_band if name == "criteria" else engine.overall_band
+    round_half = floor_half if name == "criteria" else ceil_half
+
+    lookups = 0
+    failures = []
+    for tail in itertools.product(range(HALF_BANDS), repeat=3):
+        indices = (head,) + tail
+        scores = [BANDS[i] for i in indices]
+        band = combine(scores)
+        lookups += 1
+
+        # Exact: the mean is (index sum + 8) / 8, so compare in quarter bands
+        total = sum(indices) + 8
+        expected = round_half(Fraction(total, 8))
+        if band != expected:
+            failures.append(f"{scores}: got {band}, expected {float(expected)}")
+        elif not (band * 8 <= total < band * 8 + 4 if name == "criteria" else band * 8 - 4 < total <= band * 8):
+            failures.append(f"{scores}: {band} is not the rounded mean {total / 8}")
+
+        if combine(scores[::-1]) != band:
+            failures.append(f"{scores}: depends on input order")
+        lookups += 1
+
+        for position, index in enumerate(indices):
+            if index + 1 < HALF_BANDS:
+                higher = list(scores)
+                higher[position] = BANDS[index + 1]
+                lookups += 1
+                if combine(higher) < band:
+                    failures.append(f"not monotonic: {scores} -> {band}, {higher} -> {combine(higher)}")
+
+        if len(failures) > MAX_FAILURES:
+            break
+    return lookups, failures
+
+
+def check_writing(engine):
+    lookups = 0
+    failures = []
+    results = {}
+    for t1, t2 in itertools.product(range(HALF_BANDS), repeat=2):
+        band = results[t1, t2] = engine.writing_band(BANDS[t1], BANDS[t2])
+        lookups += 1
+        weighted = Fraction(BANDS[t1]) / 3 + Fraction(BANDS[t2]) * 2 / 3
+        expected = reference_writing(BANDS[t1], BANDS[t2])
+        if band != expected:
+            failures.append(f"Task 1 {BANDS[t1]}, Task 2 {BANDS[t2]}: got {band}, expected {float(expected)}")
+        elif not band - HALF < weighted <= band:
+            failures.append(f"Task 1 {BANDS[t1]}, Task 2 {BANDS[t2]}: {band} is not the rounded weighted mean")
+
+    for (t1, t2), band in results.items():
+        for higher in ((t1 + 1, t2), (t1, t2 + 1)):
+            if higher in results and results[higher] < band:
+                failures.append(f"not monotonic: {(BANDS[t1], BANDS[t2])} -> {band}, "
+                                f"{(BANDS[higher[0]], BANDS[higher[1]])} -> {results[higher]}")
+        if t1 + 1 < HALF_BANDS and t2 + 1 < HALF_BANDS and results[t1, t2 + 1] < results[t1 + 1, t2]:
+            failures.append(f"Task 1 outweighs Task 2 at {(BANDS[t1], BANDS[t2])}")
+    return lookups, failures
+
+
+# Workers
+
+_engines = {}
+
+
+def init_worker(specs):
+    for spec in specs:
+        _engines[spec] = load_engine(spec)
+
+
+def run_task(task):
+    spec, name, argument = task
+    engine = _engines[spec]
+    started = time.perf_counter()
+    if name in CONVERSION_CHECKS:
+        lookups, failures = check_conversion(engine, name, argument)
+    elif name == "writing":
+        lookups, failures = check_writing(engine)
+    else:
+        lookups, failures = check_four(engine, name, argument)
+    return spec, name, lookups, time.perf_counter() - started, failures[:MAX_FAILURES]
+
+
+def tasks_for(spec, thresholds):
+    for name in CONVERSION_CHECKS:
+        yield spec, name, thresholds[name]
+    yield spec, "writing", None
+    for name in ("criteria", "overall"):
+        for head in range(HALF_BANDS):
+            yield spec, name, head
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", action="append", help="engine to check (default: scoring and tables)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--conversion", help="conversion data file (default: CONVERSION_TABLES_PATH)")
+    args = parser.parse_args()
+
+    if args.conversion:
+        os.environ["CONVERSION_TABLES_PATH"] = args.conversion
+    specs = args.engine or ["scoring", "tables"]
+
+    conversion_path = os.getenv("CONVERSION_TABLES_PATH") or scoring.DEFAULT_CONVERSION_PATH
+    with open(conversion_path, encoding="utf-8") as f:
+        data = json.load(f)
+    thresholds = {name: data[name] for name in CONVERSION_CHECKS}
+
+    started = time.perf_counter()
+    tasks = [task for spec in specs for task in tasks_for(spec, thresholds)]
+    with Pool(args.workers, initializer=init_worker, initargs=(specs,)) as pool:
+        results = pool.map(run_task, tasks, chunksize=1)
+    elapsed = time.perf_counter() - started
+
+    totals = {}
+    for spec, name, lookups, seconds, failures in results:
+        total = totals.setdefault((spec, name), [0, 0.0, []])
+        total[0] += lookups
+        total[1] += seconds
+        total[2].extend(failures)
+
+    print(f"{'engine':<12} {'check':<18} {'lookups':>9} {'time':>9} {'lookups/s':>11}  result")
+    failed = False
+    for (spec, name), (lookups, seconds, failures) in totals.items():
+        status = "ok" if not failures else "FAILED"
+        print(f"{spec:<12} {name:<18} {lookups:>9} {seconds * 1000:>7.0f}ms {lookups / seconds:>11.0f}  {status}")
+        for failure in failures[:MAX_FAILURES]:
+            print(f"    {failure}")
+        failed = failed or bool(failures)
+
+    print(f"\n{sum(total[0] for total in totals.values())} lookups in {elapsed:.2f}s on {args.workers} workers")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()